@@ -0,0 +1,182 @@
+"""
+
+Benchmark tree merging, key reducing and formatting on deep and wide trees.
+
+The configerus functions walk trees with explicit stacks.  The recursive
+versions that they replaced are kept here for comparison.  Deep trees are
+deeper than the recursion limit, so only the explicit stack versions can
+handle them.
+
+    python benchmarks/bench_deep_trees.py
+
+"""
+import sys
+import time
+from typing import Any, Callable, List
+
+import configerus
+from configerus.contrib.dict import PLUGIN_ID_SOURCE_DICT
+from configerus.format import Formatter
+from configerus.shared import tree_merge, tree_reduce
+
+DEEP_DEPTH = 5 * sys.getrecursionlimit()
+WIDE_WIDTH = 40
+WIDE_DEPTH = 3
+REPEATS = 5
+
+
+def recursive_tree_merge(source: Any, destination: Any):
+    """The recursive tree_merge."""
+    if not (isinstance(source, dict) and isinstance(destination, dict)):
+        return source
+
+    for key, value in source.items():
+        if isinstance(value, dict) and key in destination:
+            value = recursive_tree_merge(value, destination[key])
+        destination[key] = value
+
+    return destination
+
+
+def recursive_tree_reduce(tree: Any, glue: str = ".", ignore=None):
+    """The recursive tree_reduce."""
+    if isinstance(tree, str):
+        tree = [tree] if glue == "" else tree.split(glue)
+    elif isinstance(tree, int):
+        tree = [tree]
+    else:
+        flatter = []
+        for node in tree:
+            flatter += recursive_tree_reduce(node, glue, ignore)
+        tree = flatter
+
+    if ignore is None:
+        ignore = []
+    return [node for node in tree if node and node not in ignore]
+
+
+class RecursiveFormatter(Formatter):
+    """Formatter using the recursive deep format."""
+
+    def recursive_format(
+        self, data: Any, default_label: str, template_free: Any = None
+    ):
+        """The recursive deep format."""
+        if isinstance(data, list):
+            formatted_list = [
+                self.recursive_format(value, default_label) for value in data
+            ]
+            if any(new is not old for new, old in zip(formatted_list, data)):
+                return formatted_list
+        elif isinstance(data, dict):
+            formatted_dict = {
+                key: self.recursive_format(value, default_label)
+                for key, value in data.items()
+            }
+            if any(
+                formatted_dict[key] is not value for key, value in data.items()
+            ):
+                return formatted_dict
+        elif isinstance(data, str):
+            return self.format_string(data, default_label)
+        return data
+
+
+def deep_tree(leaf: Any) -> dict:
+    """Build a single chain of dicts, DEEP_DEPTH long."""
+    tree = node = {}
+    for _ in range(DEEP_DEPTH):
+        node["n"] = {"other": "value"}
+        node = node["n"]
+    node["leaf"] = leaf
+    return tree
+
+
+def wide_tree(leaf: Any, depth: int = WIDE_DEPTH) -> Any:
+    """Build a tree WIDE_WIDTH wide at every level."""
+    if depth == 0:
+        return leaf
+    return {
+        f"key{index}": wide_tree(leaf, depth - 1)
+        for index in range(WIDE_WIDTH)
+    }
+
+
+def deep_key() -> List[Any]:
+    """Build a nested key, DEEP_DEPTH lists deep."""
+    key: Any = "leaf"
+    for _ in range(DEEP_DEPTH):
+        key = ["n", key]
+    return key
+
+
+def timed(function: Callable, make_args: Callable) -> str:
+    """Time the best of some runs of a function, with fresh arguments."""
+    best = None
+    for _ in range(REPEATS):
+        args = make_args()
+        start = time.perf_counter()
+        try:
+            function(*args)
+        except RecursionError:
+            return "RecursionError"
+        taken = time.perf_counter() - start
+        best = taken if best is None else min(best, taken)
+    return f"{best * 1000:8.2f}ms"
+
+
+def main():
+    """Run the benchmark."""
+    config = configerus.new_config()
+    config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(
+        {"variables": {"one": "one"}}
+    )
+    iterative_format = Formatter(config).recursive_format
+    recursive_format = RecursiveFormatter(config).recursive_format
+
+    deep_template, wide_template = (
+        deep_tree("{{variables:one}}"),
+        wide_tree("{{variables:one}}"),
+    )
+    wide_key = [[["a.b", ["c"]], "d.e"]] * (WIDE_WIDTH**2)
+
+    cases = [
+        (
+            "tree_merge",
+            (tree_merge, recursive_tree_merge),
+            lambda: (deep_tree("source"), deep_tree("dest")),
+            lambda: (wide_tree("source"), wide_tree("dest")),
+        ),
+        (
+            "tree_reduce",
+            (tree_reduce, recursive_tree_reduce),
+            lambda: (deep_key(),),
+            lambda: (wide_key,),
+        ),
+        (
+            "recursive_format",
+            (iterative_format, recursive_format),
+            lambda: (deep_template, "variables"),
+            lambda: (wide_template, "variables"),
+        ),
+    ]
+
+    print(
+        f"deep: {DEEP_DEPTH} levels, wide: {WIDE_WIDTH}^{WIDE_DEPTH} leaves, "
+        f"best of {REPEATS}"
+    )
+    print(f"{'':18}{'deep':>16}{'wide':>16}")
+    for name, (iterative, recursive), deep_args, wide_args in cases:
+        for variant, function in [
+            ("stack", iterative),
+            ("recursive", recursive),
+        ]:
+            print(
+                f"{name:18}{variant:>10}"
+                f"{timed(function, deep_args):>16}"
+                f"{timed(function, wide_args):>16}"
+            )
+
+
+if __name__ == "__main__":
+    main()
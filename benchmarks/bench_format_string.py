@@ -0,0 +1,88 @@
+"""
+
+Benchmark template tokenizing and formatting on long strings with many tags.
+
+The tokenizer is a single regex split of the string.  The replace and split
+tokenizer that it replaced is kept here for comparison; it copies the string
+once per token, and breaks on text which contains its "@@@" marker.
+
+Formatting is timed both with the compiled template cache cleared before every
+format, and with the cache warm.
+
+    python benchmarks/bench_format_string.py
+
+"""
+import time
+from typing import Callable, List
+
+import configerus
+from configerus.contrib.dict import PLUGIN_ID_SOURCE_DICT
+from configerus.format import (
+    Formatter,
+    compile_template,
+    tokenize_template,
+)
+
+TAG_COUNTS = [10, 100, 1000]
+REPEATS = 20
+
+TAG = "text {{variables:one}} and {{fail?value::{{variables:two}}}} "
+
+
+def replace_tokenize_template(subject: str) -> List[str]:
+    """The replace and split tokenizer."""
+    subject_tokenized = subject
+    for token in ["{{", "}}", "::", "?"]:
+        subject_tokenized = subject_tokenized.replace(
+            token, "@@@{}@@@".format(token)
+        )
+    return [part for part in subject_tokenized.split("@@@") if part]
+
+
+def timed(function: Callable, before: Callable = None) -> str:
+    """Time the best of some runs of a function."""
+    best = None
+    for _ in range(REPEATS):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        function()
+        taken = time.perf_counter() - start
+        best = taken if best is None else min(best, taken)
+    return f"{best * 1000:8.3f}ms"
+
+
+def main():
+    """Run the benchmark."""
+    config = configerus.new_config()
+    config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(
+        {"variables": {"one": "one", "two": "two"}}
+    )
+    formatter = Formatter(config)
+
+    print(f"best of {REPEATS}")
+    print(
+        f"{'tags':>6}{'chars':>9}{'replace':>14}{'scan':>14}"
+        f"{'format cold':>14}{'format warm':>14}"
+    )
+    for count in TAG_COUNTS:
+        subject = TAG * count
+        assert tokenize_template(subject) == replace_tokenize_template(
+            subject
+        )
+        print(
+            f"{count * 2:>6}{len(subject):>9}"
+            f"{timed(lambda: replace_tokenize_template(subject)):>14}"
+            f"{timed(lambda: tokenize_template(subject)):>14}"
+            + timed(
+                lambda: formatter.format_string(subject, "variables"),
+                compile_template.cache_clear,
+            ).rjust(14)
+            + timed(
+                lambda: formatter.format_string(subject, "variables")
+            ).rjust(14)
+        )
+
+
+if __name__ == "__main__":
+    main()
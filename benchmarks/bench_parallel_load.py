@@ -0,0 +1,82 @@
+"""
+
+Benchmark serial vs parallel source loading.
+
+Each source sleeps before returning its data, to simulate a source on a slow
+network mount.  With load_workers the sources overlap, so the cold load time
+approaches the slowest source instead of the sum of all of them.
+
+    python benchmarks/bench_parallel_load.py
+
+"""
+import time
+from typing import Any, Dict
+
+import configerus
+from configerus.config import Config
+from configerus.plugin import SourceFactory
+
+PLUGIN_ID_SOURCE_SLOW = "bench-slow"
+SOURCE_COUNT = 12
+SOURCE_LATENCY = 0.05
+LABEL_COUNT = 5
+
+
+class SlowSourcePlugin:
+    """Dict source which takes a while to answer."""
+
+    def __init__(self, config: Config, instance_id: str):
+        """Initialize the plugin."""
+        self.config = config
+        self.instance_id = instance_id
+
+    def load(self, label: str) -> Dict[str, Any]:
+        """Pretend to do some I/O and return some data."""
+        time.sleep(SOURCE_LATENCY)
+        return {"source": self.instance_id, self.instance_id: {"label": label}}
+
+
+@SourceFactory(plugin_id=PLUGIN_ID_SOURCE_SLOW)
+def plugin_factory_source_slow(config: Config, instance_id: str = ""):
+    """Create a slow source plugin."""
+    return SlowSourcePlugin(config, instance_id)
+
+
+def build_config(workers: int) -> Config:
+    """Build a config with many slow sources."""
+    config = configerus.new_config(bootstraps=[])
+    config.load_workers = workers
+    for index in range(SOURCE_COUNT):
+        config.add_source(
+            PLUGIN_ID_SOURCE_SLOW, f"slow_{index}", priority=50 + index
+        )
+    return config
+
+
+def run(workers: int) -> float:
+    """Load some labels and return the wall clock time taken."""
+    config = build_config(workers)
+    start = time.perf_counter()
+    for index in range(LABEL_COUNT):
+        config.load(f"label_{index}")
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark."""
+    serial = run(0)
+    print(
+        f"{SOURCE_COUNT} sources x {LABEL_COUNT} labels, "
+        f"{SOURCE_LATENCY * 1000:.0f}ms latency per source load"
+    )
+    print(f"serial       : {serial:.3f}s")
+    for workers in [2, 4, SOURCE_COUNT]:
+        parallel = run(workers)
+        print(
+            f"{workers:2d} workers   : {parallel:.3f}s "
+            f"({serial / parallel:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
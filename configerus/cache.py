@@ -0,0 +1,130 @@
+"""
+
+Persistent on-disk cache of merged config.
+
+Merged label data can be kept on disk between processes, so that short lived
+processes don't have to parse the same config files every time they start.
+
+Every cache entry is keyed by a fingerprint of all of the sources which
+contributed to it.  Source plugins provide a fingerprint(label) method which
+returns something cheap to compute that changes whenever the data that they
+would load changes (such as file paths, mtimes and sizes.)  If any source
+cannot provide a fingerprint then the label is not cached.
+
+The cache is stored using pickle, so only point it at a directory that you
+trust.
+
+"""
+import logging
+import os
+import pickle
+import hashlib
+import tempfile
+from typing import Any, List, Optional
+from urllib.parse import quote
+
+logger = logging.getLogger("configerus.cache")
+
+CACHE_FORMAT_VERSION = 1
+""" Bump this to invalidate all existing cache files """
+
+CACHE_FILE_EXTENSION = "pickle"
+""" File extension used for cache files """
+
+
+def cache_fingerprint(fingerprints: List[Any]) -> str:
+    """Combine source fingerprints into a single cache key.
+
+    Parameters:
+    -----------
+    fingerprints (List[Any]) : source fingerprints in source priority order.
+        Each fingerprint must have a stable repr().
+
+    Returns:
+    --------
+    str hex digest which identifies the combination of source fingerprints
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((CACHE_FORMAT_VERSION, fingerprints)).encode())
+    return digest.hexdigest()
+
+
+def cache_file(cache_path: str, label: str) -> str:
+    """Get the cache file path for a label.
+
+    The label is quoted, so that labels with path separators can't name
+    files outside of the cache path.
+    """
+    return os.path.join(
+        cache_path, f"{quote(label, safe='')}.{CACHE_FILE_EXTENSION}"
+    )
+
+
+def read_cache(cache_path: str, label: str, fingerprint: str) -> Optional[Any]:
+    """Read cached data for a label, if the fingerprint matches.
+
+    Parameters:
+    -----------
+    cache_path (str) : directory that holds the cache files
+
+    label (str) : config label
+
+    fingerprint (str) : current cache key for the label sources
+
+    Returns:
+    --------
+    The cached merged data, or None if there is no usable cache entry
+    """
+    try:
+        with open(cache_file(cache_path, label), "rb") as cache_handle:
+            entry = pickle.load(cache_handle)
+    except FileNotFoundError:
+        return None
+    # pylint: disable=broad-except
+    except Exception as err:
+        logger.warning("Ignoring unreadable config cache '%s': %s", label, err)
+        return None
+
+    if not isinstance(entry, dict) or entry.get("fingerprint") != fingerprint:
+        logger.debug("Config cache for '%s' is out of date", label)
+        return None
+
+    logger.debug("Using cached config for '%s'", label)
+    return entry.get("data")
+
+
+def write_cache(cache_path: str, label: str, fingerprint: str, data: Any):
+    """Write merged data for a label to the cache.
+
+    The file is written to a temporary file first and moved into place, so
+    that concurrent processes never read partial entries.  Write failures are
+    logged, as the cache is only an optimization.
+
+    Parameters:
+    -----------
+    cache_path (str) : directory that holds the cache files
+
+    label (str) : config label
+
+    fingerprint (str) : cache key for the label sources
+
+    data (Any) : merged label data
+    """
+    temp_file = ""
+    try:
+        os.makedirs(cache_path, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=cache_path, delete=False
+        ) as cache_handle:
+            temp_file = cache_handle.name
+            pickle.dump(
+                {"fingerprint": fingerprint, "data": data},
+                cache_handle,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temp_file, cache_file(cache_path, label))
+    # pylint: disable=broad-except
+    except Exception as err:
+        logger.warning("Could not write config cache '%s': %s", label, err)
+        if temp_file and os.path.exists(temp_file):
+            os.unlink(temp_file)
@@ -7,16 +7,25 @@ Configerus functionality.
 
 """
 import logging
+import asyncio
+import contextlib
+import os
+import threading
+import time
 from importlib import metadata
+from concurrent.futures import ThreadPoolExecutor
 import copy
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from .plugin import Factory, Type
-from .instances import PluginInstances
-from .shared import tree_merge
-from .loaded import Loaded
+from .instances import PluginInstances, PluginInstance
+from .shared import tree_merge, tree_freeze
+from .loaded import Loaded, LOADED_RESOLVE_LAZY, LOADED_RESOLVE_EAGER
+from .layered import LayeredDict
+from .cache import cache_fingerprint, read_cache, write_cache
 from .validator import ValidationError
 from .format import Formatter
+from .graph import TemplateGraph
 
 logger = logging.getLogger("configerus:config")
 
@@ -26,6 +35,11 @@ CONFIGERUS_BOOTSTRAP_ENTRYPOINT = "configerus.bootstrap"
 CONFIG_PATH_LABEL = "paths"
 """ If you load this label, it is meant to be return a keyed path """
 
+DEPENDENCY_LABEL = "label"
+""" Dependency kind for formatting which read another config label """
+DEPENDENCY_FILE = "file"
+""" Dependency kind for formatting which read a file """
+
 PLUGIN_DEFAULT_PRIORITY = 75
 """ Default plugin priority, which should be a common unprioritized value
 
@@ -41,6 +55,12 @@ General approach:
 """
 
 
+def _add_timing(timings: Optional[Dict[str, float]], label: str, start: float):
+    """Add the seconds since start to the timing for a label, if timing."""
+    if timings is not None:
+        timings[label] = timings.get(label, 0.0) + time.perf_counter() - start
+
+
 class Config:
     """Config management class (v3).
 
@@ -67,7 +87,7 @@ class Config:
 
     def __init__(self):
         """Initialize Config object."""
-        self.plugins = PluginInstances(self.make_plugin)
+        self.plugins = PluginInstances(self.make_plugin, self.copy_plugin)
         """List of all of the plugins as PluginInstance wrappers
 
         This mixes plugin types together but but it simplifies management
@@ -76,16 +96,136 @@ class Config:
         self.loaded = {}
         """ cache of config that has been loaded """
 
+        self.layers: Dict[PluginInstance, Dict[str, Any]] = {}
+        """ cache of the raw data that each source returned for each label
+
+        Keeping the per-source layers means that adding, removing or reloading
+        a source only has to re-merge, and doesn't need every other source to
+        load the label again. """
+
+        self.load_workers: int = 0
+        """ how many threads to use to query sources when loading a label
+
+        0 or 1 means that the sources are queried one after another.  More
+        workers let sources with slow I/O (network mounts etc) overlap.  The
+        merge always happens afterwards in source priority order. """
+
+        self.readonly: bool = False
+        """ if True, loaded config data is frozen so that it can't be changed
+
+        Read-only data can be handed out by get() without any risk of callers
+        changing the loaded config, so nobody has to copy it. """
+
+        self.cache_path: str = ""
+        """ if set, merged label data is cached on disk in this directory
+
+        Cache entries are keyed on fingerprints from all of the sources, and
+        are only used if all sources can fingerprint the label.
+        @see configerus.cache """
+
+        self.preload_thread: Optional[threading.Thread] = None
+        """ background thread used by the last preload(background=True) """
+
+        self.load_lock = threading.RLock()
+        """ held while loaded config and source layers are read and changed,
+        so that a background preload and foreground loads don't collide.  It
+        is never held while sources load or data is merged. """
+
+        self.loading: Dict[str, threading.Event] = {}
+        """ labels which are being loaded, to an event which is set when the
+        load is done, so that other loads of a label wait for just that """
+
+        self.source_generation: int = 0
+        """ counts changes to the sources, so that loads which started before
+        a change don't keep what they loaded """
+
+        self.format_memo: bool = False
+        """ if True, Loaded.get() keeps formatted values for reuse
+
+        Each kept value records the labels and files that its templates read,
+        and is forgotten when one of those is reloaded (or when a formatter
+        is added.)  Only turn this on if all of the formatter plugins record
+        what they read, and tell the config when files change.
+        @see invalidate() """
+
+        self.index_loaded: bool = False
+        """ if True, loaded labels build a flat index of all of their paths
+
+        The index is built the first time that a label is read, after which
+        each get() is a single dict lookup.  This suits big labels that are
+        read by full key.  Loaded data must not be changed after it has been
+        indexed (@see readonly.) """
+
+        self.lazy_merge: bool = False
+        """ if True, source data is only merged where it is read
+
+        Loaded labels keep the source layers in a LayeredDict, and get()
+        only merges the path to, and the value of, the key that it reads.
+        This suits big labels of which only a few keys are used.  Reading
+        Loaded.data (or using the flat index, key listing, disk cache or
+        eager resolving) merges everything. """
+
+        self.dependency_frames = threading.local()
+        """ per-thread stack of dependency sets for formatting in progress """
+
+        self.formatter: Optional[Formatter] = None
+        """ formatter reused by format(), made when first needed and dropped
+        when a formatter plugin is added (@see Formatter.dispatch) """
+
     def copy(self):
         """Make a copy of this config object.
 
         So that we can independently edit the copy without affecting the
         original.
+
+        The copy is cheap: plugins are shared copy-on-write, so a plugin is
+        only copied when one of the config objects uses it, and the copy
+        starts with the loaded config and source layers of this object.  This
+        object always keeps its plugin objects, so handles returned by
+        add_source() etc keep working.  The copy makes its own plugin before
+        this object uses the plugin, but changes made directly through such a
+        handle before then are seen by the copy too.
+
+        Either config only picks up changes made to its plugins after the
+        copy once it calls reload_source() for them, as the source layers
+        loaded before the copy are shared until then.
         """
         config_copy = Config()
         config_copy.plugins = self.plugins.copy(
             config_copy.make_plugin, config_copy.copy_plugin
         )
+        config_copy.load_workers = self.load_workers
+        config_copy.cache_path = self.cache_path
+        config_copy.readonly = self.readonly
+        config_copy.format_memo = self.format_memo
+        config_copy.index_loaded = self.index_loaded
+        config_copy.lazy_merge = self.lazy_merge
+
+        with self.load_lock:
+            # the plugin lists match, so we can match up instances for the
+            # layers
+            for instance, instance_copy in zip(
+                self.plugins.instances, config_copy.plugins.instances
+            ):
+                if instance in self.layers:
+                    config_copy.layers[instance_copy] = dict(
+                        self.layers[instance]
+                    )
+
+            for label, loaded in self.loaded.items():
+                layered = loaded.layered
+                if layered is not None and layered.materialized is None:
+                    # nothing has been merged, so there are no flags yet
+                    config_copy.loaded[label] = config_copy.make_loaded(
+                        label, layered
+                    )
+                else:
+                    # the same data, so the template-free flags still hold
+                    config_copy.loaded[label] = config_copy.make_loaded(
+                        label, loaded.data, loaded.template_free
+                    )
+                config_copy.loaded[label].resolved = loaded.resolved
+
         return config_copy
 
     def bootstrap(self, bootstrap_id: str):
@@ -206,15 +346,74 @@ class Config:
         @function arguments
 
         """
-        # drop any loaded config
-        self.loaded = {}
-        # add the plugin to our list.
-        return self.plugins.add_plugin(
-            Type.SOURCE, plugin_id, instance_id, priority
+        with self.load_lock:
+            # drop any merged config, but keep the source layers
+            self.loaded = {}
+            self.source_generation += 1
+            # add the plugin to our list.
+            return self.plugins.add_plugin(
+                Type.SOURCE, plugin_id, instance_id, priority
+            )
+
+    def remove_source(self, instance_id: str):
+        """Remove a config source from the config object.
+
+        Loaded config will be re-merged on the next load without the removed
+        source, but without asking the other sources to load again.
+
+        Parameters:
+        -----------
+        instance_id (str) : instance_id of the source plugin(s) to remove.
+
+        Raises:
+        -------
+        KeyError if no source matched the instance_id
+        """
+        removed = self.plugins.remove_plugins(
+            instance_id=instance_id, type=Type.SOURCE
         )
+        if not removed:
+            raise KeyError(f"No config source '{instance_id}' to remove")
+
+        with self.load_lock:
+            for instance in removed:
+                self.layers.pop(instance, None)
+            self.loaded = {}
+            self.source_generation += 1
+
+    def reload_source(self, instance_id: str):
+        """Forget what a source has loaded, so that it has to load again.
+
+        Use this if a source plugin has been changed, such as given new dict
+        data or a new path.  Only that source will load again, other sources
+        keep their cached layers.
+
+        Parameters:
+        -----------
+        instance_id (str) : instance_id of the source plugin(s) to reload.
+
+        Raises:
+        -------
+        KeyError if no source matched the instance_id
+        """
+        instances = self.plugins.get_instances(
+            instance_id=instance_id, type=Type.SOURCE
+        )
+        if not instances:
+            raise KeyError(f"No config source '{instance_id}' to reload")
+
+        with self.load_lock:
+            for instance in instances:
+                self.layers.pop(instance, None)
+            self.loaded = {}
+            self.source_generation += 1
 
     def load(
-        self, label: str, force_reload: bool = False, validator: str = ""
+        self,
+        label: str,
+        force_reload: bool = False,
+        validator: str = "",
+        resolve: str = LOADED_RESOLVE_LAZY,
     ) -> Loaded:
         """Load a config label.
 
@@ -235,6 +434,13 @@ class Config:
         validator (str) : string key passed to the validate() method which will
             validate the retrieved data before returning it.
 
+        resolve (str) : when to format templates in the loaded data.
+            "lazy" (LOADED_RESOLVE_LAZY) formats values each time they are
+                retrieved using .get().
+            "eager" (LOADED_RESOLVE_EAGER) formats all of the label data now,
+                and keeps the results, so .get() is a plain lookup.  Use this
+                for config that is read often and doesn't change.
+
         Returns:
         --------
         A Loaded object from which you can .get() specific pieces of config
@@ -247,33 +453,932 @@ class Config:
         If you request a validation, and validation fails, then a Validation
         error with be raised.
         """
-        if force_reload or label not in self.loaded:
-            # Load data from all of the sources for a label
-            logger.debug("Loading Config '%s' from all sources", label)
-
-            data: Dict[str, Any] = {}
-            # merge in data from the higher priorty into the lower priority
-            for source in self.plugins.get_plugins(type=Type.SOURCE):
-                source_data = source.load(label)
-                if source_data:
-                    data = tree_merge(data, source_data)
+        loaded = self._load_labels([label], force_reload)[label]
+        if force_reload:
+            self.invalidate(DEPENDENCY_LABEL, label)
+        self._resolve_loaded(loaded, resolve)
+
+        if validator:
+            self.validate(loaded.data, validator)
+
+        logger.debug("Loaded config %s", label)
+        return loaded
+
+    def load_many(
+        self,
+        labels: List[str],
+        force_reload: bool = False,
+        validator: str = "",
+        resolve: str = LOADED_RESOLVE_LAZY,
+    ) -> Dict[str, Loaded]:
+        """Load a number of config labels in one batch.
+
+        This behaves like calling load() for each label, but source plugins
+        which have a load_many(labels) method get to load all of the labels
+        in one call, which lets them share work such as directory scans.
+
+        Parameters:
+        -----------
+        labels (List[str]) : Config labels to load.
+
+        force_reload (bool) : if true, and data has been loaded before, this
+            forces a fresh reload of data from the sources
+
+        validator (str) : string key passed to the validate() method which will
+            validate the retrieved data for each label before returning it.
+
+        resolve (str) : when to format templates. @see load()
+
+        Returns:
+        --------
+        Dict of label to Loaded object for every requested label
+
+        Throws:
+        -------
+        @see load()
+        """
+        labels = list(dict.fromkeys(labels))
+        loaded = self._load_labels(labels, force_reload)
+        for label in labels:
+            if force_reload:
+                self.invalidate(DEPENDENCY_LABEL, label)
+            self._resolve_loaded(loaded[label], resolve)
+
+        if validator:
+            for label in labels:
+                self.validate(loaded[label].data, validator)
+
+        return loaded
+
+    def source_labels(self) -> List[str]:
+        """List all of the labels that the sources can tell us about.
+
+        Source plugins can offer a labels() method which returns the labels
+        that they could provide data for.  Sources without the method are
+        skipped, so this list may not be complete.
+
+        Returns:
+        --------
+        List[str] of labels, in no particular order, without duplicates
+        """
+        labels: Dict[str, None] = {}
+        for instance in self._source_instances():
+            if hasattr(instance.plugin, "labels"):
+                labels.update(dict.fromkeys(instance.plugin.labels()))
+        return list(labels)
+
+    def template_graph(self, labels: List[str] = None) -> TemplateGraph:
+        """Scan loaded config for templates which refer to other config.
+
+        The labels are loaded (but not formatted) and scanned for template
+        targets.  Labels that the templates refer to are loaded and scanned as
+        well.  Only formatter plugins with a `target(key, default_label)`
+        method (such as the get plugin) can tell which config a template
+        refers to.
+
+        Parameters:
+        -----------
+        labels (List[str]) : labels to start from.  If None then all labels
+            that the sources can list are used (@see source_labels())
+
+        Returns:
+        --------
+        A TemplateGraph which can report cycles and a label order.
+        @see configerus.graph
+        """
+        if labels is None:
+            labels = self.source_labels()
+
+        # templates are interpreted with the same plugins as formatting
+        formatter = self._formatter()
+        formatter.refresh_dispatch()
+
+        def targeter(plugin: Optional[str], key: str, label: str):
+            if plugin is None:
+                plugin = formatter.default_plugin_for_target
+            instance = formatter.dispatch.get(plugin)
+            if instance is None or not hasattr(instance.plugin, "target"):
+                return None
+            return instance.plugin.target(key, label)
+
+        graph = TemplateGraph()
+        pending = list(dict.fromkeys(labels))
+        while pending:
+            label = pending.pop(0)
+            try:
+                loaded = self.load(label)
+            except KeyError:
+                graph.missing.add(label)
+                continue
+            graph.add_label(label, loaded.data, targeter)
+            pending += [
+                target
+                for target in sorted(graph.labels())
+                if target not in graph.templates
+                and target not in graph.missing
+                and target not in pending
+            ]
+
+        return graph
+
+    def preload(
+        self,
+        labels: List[str] = None,
+        background: bool = False,
+        resolve: str = LOADED_RESOLVE_LAZY,
+    ) -> Dict[str, float]:
+        """Load config labels ahead of time, so that first use is cheap.
+
+        The loaded labels are scanned for templates (@see template_graph())
+        so that template cycles are reported before any formatting happens.
+        Labels that the templates refer to are loaded too, and labels are
+        finished in dependency order.
+
+        Parameters:
+        -----------
+        labels (List[str]) : labels to load.  If None then all labels that the
+            sources can list are loaded (@see source_labels())
+
+        background (bool) : if True then the loading is done on a daemon
+            thread (kept as self.preload_thread) and this method returns
+            immediately.  Errors in the thread are logged, not raised.
+
+        resolve (str) : "eager" to also format all of the labels.  Labels are
+            resolved after the labels that they refer to, so no template
+            lookup has to load or format another label.  @see load()
+
+        Returns:
+        --------
+        Dict[str, float] of label to the seconds spent loading, merging and
+        resolving it.  Labels which were already loaded cost nothing, and
+        labels which a source loads in one load_many() call share the time of
+        the call.  In the background case, the dict is filled in as labels
+        are loaded.
+
+        Raises:
+        -------
+        ValueError if templates refer back to themselves.
+        """
+        timings: Dict[str, float] = {}
+
+        if background:
+
+            def preload_thread():
+                try:
+                    self._preload(labels, timings, resolve)
+                # pylint: disable=broad-except
+                except Exception:
+                    logger.exception("Config background preload failed")
 
-            if not data:
-                raise KeyError(
-                    f"Config '{label}' loaded data came out empty.  That means"
-                    "that no config source could find that label.  That is "
-                    "likely a problem"
+            self.preload_thread = threading.Thread(
+                target=preload_thread, name="configerus-preload", daemon=True
+            )
+            self.preload_thread.start()
+        else:
+            self._preload(labels, timings, resolve)
+
+        return timings
+
+    def _preload(
+        self,
+        labels: Optional[List[str]],
+        timings: Dict[str, float],
+        resolve: str,
+    ):
+        """Load labels, then anything they refer to in dependency order."""
+        if labels is None:
+            labels = self.source_labels()
+
+        start = time.perf_counter()
+        for label in labels:
+            timings.setdefault(label, 0.0)
+        if labels:
+            # one batch, so that sources can share work like directory scans
+            self._load_labels(labels, timings=timings)
+
+        graph = self.template_graph(labels)
+
+        cycles = graph.cycles()
+        if cycles:
+            raise ValueError(
+                "Config templates refer back to themselves: "
+                + "; ".join(
+                    ", ".join(f"{label}:{key}" for label, key in cycle)
+                    for cycle in cycles
                 )
+            )
 
-            self.loaded[label] = Loaded(
-                data=data, parent=self, instance_id=label
+        for label in graph.label_order():
+            if label in graph.missing:
+                continue
+            label_start = time.perf_counter()
+            self.load(label, resolve=resolve)
+            timings[label] = timings.get(label, 0.0) + (
+                time.perf_counter() - label_start
+            )
+            logger.debug(
+                "Preloaded config '%s' in %.4fs", label, timings[label]
             )
+        logger.info(
+            "Preloaded %s config labels in %.4fs",
+            len(timings),
+            time.perf_counter() - start,
+        )
+
+    async def aload(
+        self,
+        label: str,
+        force_reload: bool = False,
+        validator: str = "",
+        resolve: str = LOADED_RESOLVE_LAZY,
+    ) -> Loaded:
+        """Load a config label without blocking the event loop.
+
+        This is the asyncio equivalent of load(), and shares its cache.
+
+        Source plugins which have an `async def aload(label)` method are
+        awaited directly.  Any other source plugin has its load() run in the
+        default executor.  All sources are awaited together before the usual
+        priority merge.  Everything else that can block, such as waiting for
+        the load lock, reading the disk cache and merging, is also run in the
+        default executor.
+
+        Parameters:
+        -----------
+        @see load()
+
+        Returns:
+        --------
+        A Loaded object from which you can .get() or .aget() specific pieces of
+        config
+        """
+        # anything which can block (taking the load lock, the disk cache,
+        # merging) runs in the executor, so this only ever awaits
+        loop = asyncio.get_running_loop()
+        loaded = None
+        while loaded is None:
+            found, claimed, waits = await loop.run_in_executor(
+                None, self._claim_labels, [label], force_reload
+            )
+            if label in waits:
+                # another thread is loading the label, so check again after
+                await loop.run_in_executor(None, waits[label].wait)
+            elif label in found:
+                loaded = found[label]
+            else:
+                try:
+                    loaded = await self._aload_claimed(label, force_reload)
+                finally:
+                    await loop.run_in_executor(
+                        None, self._release_label, label, claimed[label]
+                    )
+
+        if force_reload:
+            await loop.run_in_executor(
+                None, self.invalidate, DEPENDENCY_LABEL, label
+            )
+        await loop.run_in_executor(None, self._resolve_loaded, loaded, resolve)
 
         if validator:
-            self.validate(self.loaded[label].data, validator)
+            await loop.run_in_executor(
+                None, self.validate, loaded.data, validator
+            )
+
+        return loaded
+
+    async def _aload_claimed(self, label: str, force_reload: bool) -> Loaded:
+        """Load a claimed label, from the disk cache or from the sources."""
+        loop = asyncio.get_running_loop()
+        generation, fingerprints, found = await loop.run_in_executor(
+            None, self._load_from_cache, [label], force_reload
+        )
+        if label in found:
+            return found[label]
+
+        logger.debug("Async loading Config '%s' from sources", label)
+        sources_data = await self._aload_sources(label, generation)
+        return await loop.run_in_executor(
+            None,
+            self._merge_sources,
+            label,
+            sources_data,
+            fingerprints[label],
+            generation,
+        )
+
+    def invalidate(self, kind: str, name: str):
+        """Forget formatted values which depend on a label or a file.
+
+        Loaded.get() keeps formatted values, along with the labels and files
+        that their templates read.  This forgets only the values that read
+        the passed dependency.  load(force_reload=True) does this for the
+        reloaded label; call it for files that have changed.
+
+        Parameters:
+        -----------
+        kind (str) : DEPENDENCY_LABEL or DEPENDENCY_FILE
+
+        name (str) : the label or the file path
+        """
+        if kind == DEPENDENCY_FILE:
+            name = os.path.abspath(name)
+        with self.load_lock:
+            loaded_labels = list(self.loaded.values())
+        for loaded in loaded_labels:
+            loaded.forget_formatted((kind, name))
+
+    @contextlib.contextmanager
+    def track_dependencies(self):
+        """Collect the dependencies recorded while formatting.
+
+        Used as a context manager which gives a set of (kind, name) tuples.
+        Nested tracking also passes its dependencies to the outer set, so
+        a value depends on everything that its templates read, directly or
+        not.
+        """
+        frames = self._dependency_stack()
+        dependencies: Set[Tuple[str, str]] = set()
+        frames.append(dependencies)
+        try:
+            yield dependencies
+        finally:
+            frames.pop()
+            if frames:
+                frames[-1].update(dependencies)
 
-        logger.debug("Loaded config %s : %s", label, self.loaded[label].data)
-        return self.loaded[label]
+    def record_dependency(self, kind: str, name: str):
+        """Record that formatting in progress read a label or a file.
+
+        Format plugins call this so that kept formatted values can be
+        forgotten when what they read changes.
+
+        Parameters:
+        -----------
+        kind (str) : DEPENDENCY_LABEL or DEPENDENCY_FILE
+
+        name (str) : the label or the file path
+        """
+        if kind == DEPENDENCY_FILE:
+            name = os.path.abspath(name)
+        self.record_dependencies([(kind, name)])
+
+    def record_dependencies(self, dependencies: Iterable[Tuple[str, str]]):
+        """Record several (kind, name) dependencies. @see record_dependency"""
+        frames = self._dependency_stack()
+        if frames:
+            frames[-1].update(dependencies)
+
+    def _dependency_stack(self) -> List[Set[Tuple[str, str]]]:
+        """Get the dependency stack for this thread."""
+        try:
+            return self.dependency_frames.stack
+        except AttributeError:
+            self.dependency_frames.stack = []
+            return self.dependency_frames.stack
+
+    # pylint: disable=no-self-use
+    def _resolve_loaded(self, loaded: Loaded, resolve: str):
+        """Apply a load() resolve option to a Loaded object."""
+        if resolve == LOADED_RESOLVE_EAGER:
+            if not loaded.resolved:
+                logger.debug("Resolving config '%s'", loaded.instance_id)
+                loaded.resolve()
+        elif not resolve == LOADED_RESOLVE_LAZY:
+            raise ValueError(
+                f"Unknown config resolve option '{resolve}', expected "
+                f"'{LOADED_RESOLVE_LAZY}' or '{LOADED_RESOLVE_EAGER}'"
+            )
+
+    def _load_labels(
+        self,
+        labels: List[str],
+        force_reload: bool = False,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Loaded]:
+        """Make sure that labels are loaded, using the least effort we can.
+
+        Labels already loaded are kept (unless force_reload), then the disk
+        cache is tried, and the rest are merged from the source layers.
+
+        The load lock is only held to claim labels and to keep what was
+        loaded.  Labels that another thread is loading are waited for, and
+        then claimed again if that load failed (or for force_reload.)
+
+        Parameters:
+        -----------
+        labels (List[str]) : config labels to load
+
+        force_reload (bool) : load the labels again from the sources
+
+        timings (Dict[str, float]) : if given, the seconds spent on each
+            label are added to it.  @see preload()
+
+        Returns:
+        --------
+        Dict of label to Loaded object for every label
+        """
+        found, claimed, waits = self._claim_labels(labels, force_reload)
+        try:
+            if claimed:
+                found.update(
+                    self._load_claimed(claimed, force_reload, timings)
+                )
+        finally:
+            for label, event in claimed.items():
+                self._release_label(label, event)
+
+        for event in waits.values():
+            event.wait()
+        if waits:
+            found.update(self._load_labels(list(waits), force_reload, timings))
+
+        return {label: found[label] for label in labels}
+
+    def _claim_labels(
+        self, labels: List[str], force_reload: bool = False
+    ) -> Tuple[
+        Dict[str, Loaded],
+        Dict[str, threading.Event],
+        Dict[str, threading.Event],
+    ]:
+        """Claim the labels that the calling thread has to load.
+
+        Returns:
+        --------
+        Tuple of: label to Loaded for labels which are already loaded, label
+        to event for labels that the caller now has to load (and release,
+        @see _release_label()), and label to event for labels which another
+        thread is loading.
+        """
+        found: Dict[str, Loaded] = {}
+        claimed: Dict[str, threading.Event] = {}
+        waits: Dict[str, threading.Event] = {}
+        with self.load_lock:
+            for label in labels:
+                if not force_reload and label in self.loaded:
+                    found[label] = self.loaded[label]
+                elif label in self.loading:
+                    waits[label] = self.loading[label]
+                else:
+                    claimed[label] = threading.Event()
+                    self.loading[label] = claimed[label]
+                    if force_reload:
+                        self._drop_layers(label)
+        return found, claimed, waits
+
+    def _release_label(self, label: str, event: threading.Event):
+        """Let go of a claimed label, waking anything that waits for it."""
+        with self.load_lock:
+            if self.loading.get(label) is event:
+                del self.loading[label]
+        event.set()
+
+    def _load_claimed(
+        self,
+        claimed: Dict[str, threading.Event],
+        force_reload: bool = False,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Loaded]:
+        """Load claimed labels from the disk cache or from the sources.
+
+        Each label is released as soon as it is loaded.
+        """
+        generation, fingerprints, found = self._load_from_cache(
+            list(claimed), force_reload, timings
+        )
+        for label in found:
+            self._release_label(label, claimed[label])
+
+        pending = [label for label in claimed if label not in found]
+        if pending:
+            logger.debug("Loading Config %s from all sources", pending)
+            sources_data = self._load_sources(pending, generation, timings)
+            for label in pending:
+                start = time.perf_counter()
+                found[label] = self._merge_sources(
+                    label,
+                    sources_data[label],
+                    fingerprints[label],
+                    generation,
+                )
+                _add_timing(timings, label, start)
+                self._release_label(label, claimed[label])
+
+        return found
+
+    def _load_from_cache(
+        self,
+        labels: List[str],
+        force_reload: bool = False,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Tuple[int, Dict[str, str], Dict[str, Loaded]]:
+        """Start loading claimed labels, using the disk cache if we can.
+
+        Returns:
+        --------
+        Tuple of: the source generation that the load started with, the disk
+        cache fingerprint of each label, and label to Loaded for labels that
+        were read from the disk cache.
+        """
+        with self.load_lock:
+            generation = self.source_generation
+
+        fingerprints = self._cache_fingerprints(labels)
+        found: Dict[str, Loaded] = {}
+        if not force_reload:
+            for label in labels:
+                start = time.perf_counter()
+                loaded = self._load_cached(
+                    label, fingerprints[label], generation
+                )
+                if loaded is not None:
+                    found[label] = loaded
+                    _add_timing(timings, label, start)
+        return generation, fingerprints, found
+
+    def _cache_fingerprints(self, labels: List[str]) -> Dict[str, str]:
+        """Get the disk cache fingerprints for some labels.
+
+        Sources which have a fingerprint_many(labels) method fingerprint all
+        of the labels at once, so that they can share work such as directory
+        scans.
+
+        Returns:
+        --------
+        Dict of label to the combined fingerprint of all of the sources for
+        the label.  An empty string means that the disk cache can't be used
+        for the label, either because it is disabled or because a source
+        can't fingerprint.
+        """
+        if not self.cache_path or not labels:
+            return {label: "" for label in labels}
+
+        sources: Dict[str, List[Any]] = {label: [] for label in labels}
+        for instance in self._source_instances():
+            plugin = instance.plugin
+            if hasattr(plugin, "fingerprint_many"):
+                fingerprints = plugin.fingerprint_many(labels)
+            elif hasattr(plugin, "fingerprint"):
+                fingerprints = {
+                    label: plugin.fingerprint(label) for label in labels
+                }
+            else:
+                logger.debug(
+                    "Not caching %s as source '%s' has no fingerprint",
+                    labels,
+                    instance.instance_id,
+                )
+                return {label: "" for label in labels}
+
+            for label in labels:
+                sources[label].append(
+                    (
+                        instance.plugin_id,
+                        instance.instance_id,
+                        instance.priority,
+                        fingerprints[label],
+                    )
+                )
+        return {
+            label: cache_fingerprint(fingerprints)
+            for label, fingerprints in sources.items()
+        }
+
+    def _load_cached(
+        self, label: str, fingerprint: str, generation: int
+    ) -> Optional[Loaded]:
+        """Try to load a label from the disk cache.
+
+        Returns:
+        --------
+        The Loaded object, or None if the label wasn't in the cache
+        """
+        if not fingerprint:
+            return None
+
+        data = read_cache(self.cache_path, label, fingerprint)
+        if not data:
+            return None
+
+        return self._keep_loaded(
+            label, self.make_loaded(label, data), generation
+        )
+
+    def _merge_sources(
+        self,
+        label: str,
+        sources_data: List[Any],
+        fingerprint: str,
+        generation: int,
+    ) -> Loaded:
+        """Merge loaded source data and keep it as the Loaded for a label.
+
+        Parameters:
+        -----------
+        label (str) : config label that the data was loaded for
+
+        sources_data (List[Any]) : data from each source in descending source
+            priority order.
+
+        fingerprint (str) : disk cache fingerprint for the sources.  If given
+            then the merged data is written to the disk cache.
+
+        generation (int) : source generation that the load started with
+
+        Returns:
+        --------
+        The Loaded object for the label
+        """
+        data: Any = {}
+        if self.lazy_merge:
+            # tree_merge ignores anything but dicts from the sources
+            data = LayeredDict(
+                [
+                    source_data
+                    for source_data in sources_data
+                    if source_data and isinstance(source_data, dict)
+                ],
+                freeze=self.readonly,
+            )
+        else:
+            # merge in data from the higher priorty into the lower priority.
+            # tree_merge doesn't change the source layers, and shares any
+            # parts of them that don't overlap.
+            for source_data in sources_data:
+                if source_data:
+                    data = tree_merge(data, source_data)
+
+        if not data:
+            raise KeyError(
+                f"Config '{label}' loaded data came out empty.  That means"
+                "that no config source could find that label.  That is "
+                "likely a problem"
+            )
+
+        if fingerprint:
+            write_cache(
+                self.cache_path,
+                label,
+                fingerprint,
+                data.materialize() if isinstance(data, LayeredDict) else data,
+            )
+
+        return self._keep_loaded(
+            label, self.make_loaded(label, data), generation
+        )
+
+    def _keep_loaded(
+        self, label: str, loaded: Loaded, generation: int
+    ) -> Loaded:
+        """Keep a Loaded object, unless the sources changed during its load.
+
+        Returns:
+        --------
+        The passed Loaded object, kept or not
+        """
+        with self.load_lock:
+            if generation == self.source_generation:
+                self.loaded[label] = loaded
+        return loaded
+
+    def make_loaded(
+        self,
+        label: str,
+        data: Any,
+        template_free: Optional[Dict[int, Any]] = None,
+    ) -> Loaded:
+        """Make a Loaded object for merged label data.
+
+        Parameters:
+        -----------
+        label (str) : config label that the data was loaded for
+
+        data (Any) : merged data for the label
+
+        template_free (Dict[int, Any]) : template-free flags already found
+            for the data, if it is already frozen (@see Loaded)
+
+        Returns:
+        --------
+        A Loaded object for the data, with the data frozen if this config is
+        read-only.
+        """
+        if self.readonly:
+            frozen = tree_freeze(data)
+            if frozen is not data:
+                # new nodes, so flags found by id no longer apply
+                template_free = None
+            data = frozen
+        return Loaded(
+            data=data,
+            parent=self,
+            instance_id=label,
+            template_free=template_free,
+        )
+
+    def _load_sources(
+        self,
+        labels: List[str],
+        generation: int,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, List[Any]]:
+        """Get the data layers for some labels from every source plugin.
+
+        Sources are only asked to load labels for which we don't already have
+        the layer cached.  Sources which have a load_many(labels) method are
+        asked for all of their missing labels at once.  If load_workers
+        allows it then the sources are queried concurrently on a bounded
+        thread pool.
+
+        Parameters:
+        -----------
+        labels (List[str]) : config labels to get the layers for
+
+        generation (int) : source generation that the load started with
+
+        timings (Dict[str, float]) : if given, the seconds that the sources
+            spent loading each label are added to it.  Labels loaded in one
+            load_many() call share the time of the call.
+
+        Returns:
+        --------
+        Dict of label to list of source data for the label, one entry per
+        source plugin in descending priority order (the order in which they
+        should be merged.)
+        """
+        instances, missing = self._missing_layers(labels)
+
+        def load_instance(
+            instance: PluginInstance,
+        ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+            plugin = instance.plugin
+            instance_missing = missing[instance]
+            if hasattr(plugin, "load_many"):
+                start = time.perf_counter()
+                instance_data = plugin.load_many(instance_missing)
+                share = (time.perf_counter() - start) / len(instance_missing)
+                return instance_data, {
+                    label: share for label in instance_missing
+                }
+
+            instance_data = {}
+            instance_timings = {}
+            for label in instance_missing:
+                start = time.perf_counter()
+                instance_data[label] = plugin.load(label)
+                instance_timings[label] = time.perf_counter() - start
+            return instance_data, instance_timings
+
+        if self.load_workers <= 1 or len(missing) <= 1:
+            results = [load_instance(instance) for instance in missing]
+        else:
+            logger.debug(
+                "Loading Config %s from %s sources on %s threads",
+                labels,
+                len(missing),
+                self.load_workers,
+            )
+            with ThreadPoolExecutor(
+                max_workers=min(self.load_workers, len(missing))
+            ) as executor:
+                # map() keeps the source order, and re-raises any exception
+                results = list(executor.map(load_instance, missing))
+
+        if timings is not None:
+            for _, instance_timings in results:
+                for label, taken in instance_timings.items():
+                    timings[label] = timings.get(label, 0.0) + taken
+
+        return self._source_layers(
+            labels,
+            instances,
+            {
+                instance: instance_data
+                for instance, (instance_data, _) in zip(missing, results)
+            },
+            generation,
+        )
+
+    async def _aload_sources(self, label: str, generation: int) -> List[Any]:
+        """Get the data layer for a label from every source, concurrently.
+
+        Returns:
+        --------
+        List of source data for the label, one entry per source plugin in
+        descending priority order (the order in which they should be merged.)
+        """
+        loop = asyncio.get_running_loop()
+        instances, missing = await loop.run_in_executor(
+            None, self._missing_layers, [label]
+        )
+
+        loads = []
+        for instance in missing:
+            if hasattr(instance.plugin, "aload"):
+                loads.append(instance.plugin.aload(label))
+            else:
+                loads.append(
+                    loop.run_in_executor(None, instance.plugin.load, label)
+                )
+
+        # gather() keeps the source order
+        missing_data = await asyncio.gather(*loads)
+
+        sources_data = await loop.run_in_executor(
+            None,
+            self._source_layers,
+            [label],
+            instances,
+            {
+                instance: {label: data}
+                for instance, data in zip(missing, missing_data)
+            },
+            generation,
+        )
+        return sources_data[label]
+
+    def _source_instances(self) -> List[PluginInstance]:
+        """Get the source plugin instances in descending priority order."""
+        instances = self.plugins.get_instances(type=Type.SOURCE)
+        if not instances:
+            raise KeyError("Could not find any config source plugins")
+        return instances
+
+    def _missing_layers(
+        self, labels: List[str]
+    ) -> Tuple[List[PluginInstance], Dict[PluginInstance, List[str]]]:
+        """Find which sources have to load which labels.
+
+        Returns:
+        --------
+        Tuple of: all source instances in descending priority order, and
+        instance to the labels that it has no cached layer for
+        """
+        instances = self._source_instances()
+        missing = {}
+        with self.load_lock:
+            for instance in instances:
+                instance_layers = self.layers.get(instance, {})
+                instance_missing = [
+                    label for label in labels if label not in instance_layers
+                ]
+                if instance_missing:
+                    missing[instance] = instance_missing
+        return instances, missing
+
+    def _source_layers(
+        self,
+        labels: List[str],
+        instances: List[PluginInstance],
+        loaded: Dict[PluginInstance, Dict[str, Any]],
+        generation: int,
+    ) -> Dict[str, List[Any]]:
+        """Cache freshly loaded layers and return all layers for labels.
+
+        Parameters:
+        -----------
+        labels (List[str]) : config labels that were loaded
+
+        instances (List[PluginInstance]) : all source instances in descending
+            priority order
+
+        loaded (Dict[PluginInstance, Dict[str, Any]]) : what each source
+            that was just asked to load returned, per label
+
+        generation (int) : source generation that the load started with.  If
+            the sources have changed since, then nothing is cached.
+
+        Returns:
+        --------
+        Dict of label to list of source data, one entry per instance
+        """
+        with self.load_lock:
+            keep = generation == self.source_generation
+            sources_data: Dict[str, List[Any]] = {
+                label: [] for label in labels
+            }
+            for instance in instances:
+                instance_layers = self.layers.get(instance, {})
+                if instance in loaded:
+                    if keep:
+                        instance_layers = self.layers.setdefault(instance, {})
+                    else:
+                        instance_layers = dict(instance_layers)
+                    for label in labels:
+                        if label in loaded[instance]:
+                            instance_layers[label] = loaded[instance][label]
+                        elif label not in instance_layers:
+                            # the source has nothing for the label, which is
+                            # worth keeping so that it isn't asked again
+                            instance_layers[label] = {}
+                for label in labels:
+                    sources_data[label].append(instance_layers.get(label))
+            return sources_data
+
+    def _drop_layers(self, label: str):
+        """Forget all cached source layers for a label."""
+        for layers in self.layers.values():
+            layers.pop(label, None)
 
     # Formatter plugin usage and management
 
@@ -310,11 +1415,22 @@ class Config:
         that it supports, and the code here doesn't need to get fancy with
         function arguments
         """
-        return self.plugins.add_plugin(
-            Type.FORMATTER, plugin_id, instance_id, priority
-        )
+        with self.load_lock:
+            self.formatter = None
+            # a new formatter can change what templates give
+            for loaded in self.loaded.values():
+                loaded.forget_formatted()
+            return self.plugins.add_plugin(
+                Type.FORMATTER, plugin_id, instance_id, priority
+            )
 
-    def format(self, data, default_label: Any, validator: str = ""):
+    def format(
+        self,
+        data,
+        default_label: Any,
+        validator: str = "",
+        template_free: Optional[Dict[int, Any]] = None,
+    ):
         """Format some data using the config object formatters.
 
         Parameters:
@@ -335,6 +1451,11 @@ class Config:
 
             if empty/None then no validation is performed.
 
+        template_free (Dict[int, Any]) : lists and dicts in the data which are
+            known to hold no templates, so they don't need to be walked.  The
+            nodes must not be changed while the flags are in use.
+            @see configerus.format.template_free_nodes()
+
         Raises:
         -------
         Will throw a ValueError if your data contains a format tag that cannot
@@ -342,14 +1463,22 @@ class Config:
         Will raise a KeyError if your data contains a format tag with a bad key
         for action, or for a value as interpreted by the plugin.
         """
-        formatter = Formatter(self)
-        data = formatter.format(data=data, default_label=default_label)
+        data = self._formatter().format(
+            data=data, default_label=default_label, template_free=template_free
+        )
 
         if validator:
             self.validate(data, validator)
 
         return data
 
+    def _formatter(self) -> Formatter:
+        """Get the formatter, making it if needed (@see self.formatter)"""
+        formatter = self.formatter
+        if formatter is None:
+            formatter = self.formatter = Formatter(self)
+        return formatter
+
     # Validator plugin usage and management
 
     def has_validator(self, instance_id: str):
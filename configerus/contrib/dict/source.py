@@ -3,7 +3,7 @@
 Configerus source plugin that retrieves from a passed Dict.
 
 """
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 import copy
 
@@ -31,6 +31,14 @@ class ConfigSourceDictPlugin:
         """Assign Dict data to this config source plugin."""
         self.data = data
 
+    def labels(self) -> List[str]:
+        """List the labels that this source has data for."""
+        return list(self.data.keys())
+
+    def fingerprint(self, label: str) -> Any:
+        """Fingerprint the data for a label, for disk cache validation."""
+        return repr(self.data.get(label))
+
     def load(self, label: str) -> Dict[str, Any]:
         """Load a config label and return a Dict[str, Any] of config data.
 
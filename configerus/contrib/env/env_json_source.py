@@ -11,7 +11,7 @@ If you find that you are using a large number of ENV variables for your
 overrides, consider using the JSON plugin instead.
 
 """
-from typing import Dict, Any
+from typing import Dict, Any, List
 import logging
 import os
 import json
@@ -60,6 +60,14 @@ class ConfigSourceEnvJsonPlugin:
             except json.decoder.JSONDecodeError as err:
                 raise ValueError("Invalid json in {} ENV variable.") from err
 
+    def labels(self) -> List[str]:
+        """List the labels that the ENV json has data for."""
+        return list(self.source.keys())
+
+    def fingerprint(self, label: str) -> Any:
+        """Fingerprint the data for a label, for disk cache validation."""
+        return repr(self.source.get(label))
+
     def load(self, label: str) -> Dict[str, Any]:
         """Load a config label and return a Dict[str, Any] of config data.
 
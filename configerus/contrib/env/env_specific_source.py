@@ -55,12 +55,17 @@ class ConfigSourceEnvSpecificPlugin:
         """Set the ENV base to make the plugin not interpret all ENV vars."""
         self.base = base
 
-    def load(self, label: str) -> Dict[str, Any]:
-        """Load a config label and return a Dict[str, Any] of config data.
+    def fingerprint(self, label: str) -> Any:
+        """Fingerprint the ENV variables for a label, for cache validation."""
+        return sorted(self._filter_env(label).items())
 
-        Parameters:
-        -----------
-        label (str) : label to load
+    def _filter_env(self, label: str) -> Dict[str, str]:
+        """Get all of the ENV variables for a label, with the prefix removed.
+
+        Returns:
+        --------
+        Dict[str, str] of lower case ENV variable names (without the
+        base/label prefix) to ENV values
         """
         if self.base:
             label_prefix = "{}_{}_".format(self.base, label).upper()
@@ -71,6 +76,16 @@ class ConfigSourceEnvSpecificPlugin:
         for env_key, env_value in os.environ.items():
             if env_key.upper().startswith(label_prefix):
                 filtered[env_key[len(label_prefix) :].lower()] = env_value
+        return filtered
+
+    def load(self, label: str) -> Dict[str, Any]:
+        """Load a config label and return a Dict[str, Any] of config data.
+
+        Parameters:
+        -----------
+        label (str) : label to load
+        """
+        filtered = self._filter_env(label)
 
         organized: Dict[str, Any] = {}
         for (key, value) in filtered.items():
@@ -12,7 +12,7 @@ import logging
 
 import yaml
 
-from configerus.config import Config
+from configerus.config import Config, DEPENDENCY_FILE
 
 FILES_FORMAT_MATCH_PATTERN = r"(?P<file>(\~?\/?\w+\/)*\w*(\.\w+)?)"
 """ A regex pattern to identify files that should be embedded """
@@ -74,6 +74,7 @@ class ConfigFormatFilePlugin:
         if len(file_split) > 0:
             extension = file_split[1].lower()
 
+        self.config.record_dependency(DEPENDENCY_FILE, file)
         try:
             with open(file) as file_object:
                 if extension == ".json":
@@ -4,9 +4,8 @@ Configerus source plugins which load config from file contents.
 
 """
 import os
-import re
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 import json
 import copy
 
@@ -25,6 +24,20 @@ CONFIGERUS_PATH_LABEL = "paths"
 """ If you load this label, it is meant to be return a keyed path """
 
 
+def file_label(file: str) -> str:
+    """Get the config label for a file name.
+
+    Returns:
+    --------
+    The file name without its extension, or "" if the file isn't a config
+    file that we can load.
+    """
+    (label, extension) = os.path.splitext(file)
+    if extension[1:].lower() in FILESOURCE_FILETYPES:
+        return label
+    return ""
+
+
 class ConfigSourcePathPlugin:
     """Configerus source plugin that reads files."""
 
@@ -45,6 +58,23 @@ class ConfigSourcePathPlugin:
         """Set the config path source."""
         self.path = path
 
+    def labels(self) -> List[str]:
+        """List the labels that this source has config files for.
+
+        Returns:
+        --------
+        List[str] of config file names without extension, sorted.
+        """
+        if not os.path.isdir(self.path):
+            return []
+
+        labels = set()
+        for file in os.listdir(self.path):
+            label = file_label(file)
+            if label:
+                labels.add(label)
+        return sorted(labels)
+
     def load(self, label: str):
         """Load config for a name.
 
@@ -62,6 +92,76 @@ class ConfigSourcePathPlugin:
         --------
         Dict[str, Any] of data that was loaded for the label
         """
+        return self.load_many([label])[label]
+
+    def load_many(self, labels: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Load config for a number of names with a single directory scan.
+
+        Parameters:
+        -----------
+        labels (List[str]) : config labels to load.  @see load()
+
+        Returns:
+        --------
+        Dict[str, Dict[str, Any]] of data that was loaded for each label.
+        Every requested label is included, even if no file matched it.
+        """
+        # hold all merged data from found source files, per label
+        data: Dict[str, Dict[str, Any]] = {label: {} for label in labels}
+
+        for (label, file) in self._label_files(labels):
+            data[label] = tree_merge(self._load_file(file), data[label])
+
+        # Special case for retreiving paths instead of config
+        if CONFIGERUS_PATH_LABEL in data:
+            data[CONFIGERUS_PATH_LABEL] = {self.instance_id: self.path}
+
+        return data
+
+    def fingerprint(self, label: str) -> Any:
+        """Fingerprint the files that would be loaded for a label.
+
+        Used to decide if disk cached config is still valid.  The fingerprint
+        changes if any matching file is added, removed, or changes mtime or
+        size.
+        """
+        return self.fingerprint_many([label])[label]
+
+    def fingerprint_many(self, labels: List[str]) -> Dict[str, Any]:
+        """Fingerprint the files for a number of labels with a single scan.
+
+        Returns:
+        --------
+        Dict of label to fingerprint, @see fingerprint()
+        """
+        files: Dict[str, List[Tuple[str, int, int]]] = {
+            label: [] for label in labels
+        }
+        for (label, file) in self._label_files(labels):
+            stat = os.stat(os.path.join(self.path, file))
+            files[label].append((file, stat.st_mtime_ns, stat.st_size))
+
+        path = os.path.abspath(self.path)
+        fingerprints = {
+            label: (path, sorted(label_files))
+            for label, label_files in files.items()
+        }
+        if CONFIGERUS_PATH_LABEL in fingerprints:
+            fingerprints[CONFIGERUS_PATH_LABEL] = (self.instance_id, self.path)
+        return fingerprints
+
+    def _label_files(self, labels: List[str]) -> List[Tuple[str, str]]:
+        """Find the config files in the path for some labels.
+
+        Parameters:
+        -----------
+        labels (List[str]) : config labels to look for
+
+        Returns:
+        --------
+        List of (label, file name) tuples for all matching files, in directory
+        order.
+        """
         if not os.path.isdir(self.path):
             raise ValueError(
                 "Could not load '{}' path config, as the source path does not exist: {}".format(
@@ -69,49 +169,58 @@ class ConfigSourcePathPlugin:
                 )
             )
 
-        # Special case for retreiving paths instead of config
-        if label == CONFIGERUS_PATH_LABEL:
-            return {self.instance_id: self.path}
-
-        # hold all merged data from found source files
-        data: Dict[str, Any] = {}
-        # regex part for allowed file extensions
-        file_types_re = "|".join(FILESOURCE_FILETYPES)
-        # regex that matches all valid config filenames for the label
-        config_files_re = rf"({label})\.({file_types_re})"
-
-        for file in [
-            f for f in os.listdir(self.path) if re.match(config_files_re, f)
-        ]:
-            with open(os.path.join(self.path, file)) as matching_file:
-                extension = os.path.splitext(file)[1].lower()
-                if extension == ".json":
-                    try:
-                        file_config = json.load(matching_file)
-                    except json.decoder.JSONDecodeError as err:
-                        raise ValueError(
-                            f"Failed to parse one of the config files '{file}'"
-                        ) from err
-
-                    assert file_config, f"Empty config in {file} from file."
-                elif extension in [".yml", ".yaml"]:
-                    try:
-                        file_config = yaml.load(
-                            matching_file, Loader=yaml.FullLoader
-                        )
-                    except yaml.YAMLError as err:
-                        raise ValueError(
-                            f"Failed to parse one of the config files '{file}'"
-                        ) from err
-
-                    assert file_config, f"Empty config in {file} [{self.path}]"
-
-                else:
+        file_labels = [
+            label for label in labels if not label == CONFIGERUS_PATH_LABEL
+        ]
+        if not file_labels:
+            return []
+
+        wanted = set(file_labels)
+        label_files = []
+        for file in os.listdir(self.path):
+            label = file_label(file)
+            if label in wanted:
+                label_files.append((label, file))
+        return label_files
+
+    def _load_file(self, file: str) -> Dict[str, Any]:
+        """Load and parse a single config file from the path.
+
+        Parameters:
+        -----------
+        file (str) : file name in the path.
+
+        Returns:
+        --------
+        Dict[str, Any] of data parsed from the file
+        """
+        with open(os.path.join(self.path, file)) as matching_file:
+            extension = os.path.splitext(file)[1].lower()
+            if extension == ".json":
+                try:
+                    file_config = json.load(matching_file)
+                except json.decoder.JSONDecodeError as err:
                     raise ValueError(
-                        f"Unknown config filetype. Cannot parse '{extension}'"
-                        " files, but it matches our regex"
+                        f"Failed to parse one of the config files '{file}'"
+                    ) from err
+
+                assert file_config, f"Empty config in {file} from file."
+            elif extension in [".yml", ".yaml"]:
+                try:
+                    file_config = yaml.load(
+                        matching_file, Loader=yaml.FullLoader
                     )
+                except yaml.YAMLError as err:
+                    raise ValueError(
+                        f"Failed to parse one of the config files '{file}'"
+                    ) from err
 
-                data = tree_merge(file_config, data)
+                assert file_config, f"Empty config in {file} [{self.path}]"
 
-        return data
+            else:
+                raise ValueError(
+                    f"Unknown config filetype. Cannot parse '{extension}'"
+                    " files, but it matches our regex"
+                )
+
+        return file_config
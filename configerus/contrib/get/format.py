@@ -5,8 +5,10 @@ Configerus format plugins which can replace markers with other config contents.
 """
 import re
 import logging
+from typing import Any, Dict, List, Optional, Tuple
 
-from configerus.config import Config
+from configerus.config import Config, DEPENDENCY_LABEL
+from configerus.shared import MISSING
 
 logger = logging.getLogger("configerus.contrib.get:formatter")
 
@@ -29,6 +31,104 @@ class ConfigFormatGetPlugin:
         plugin_copy = ConfigFormatGetPlugin(self.config, self.instance_id)
         return plugin_copy
 
+    def target(self, key, default_label: str) -> Optional[Tuple[str, str]]:
+        """Interpret a format key as a config location, without loading it.
+
+        Used for static template analysis (@see configerus.graph)
+
+        Returns:
+        --------
+        (label, key) tuple, or None if the key can't be interpreted
+        """
+        match = self.pattern.fullmatch(key.strip())
+        if not match:
+            return None
+        label = match.group("label")
+        if label is None:
+            label = default_label
+        return (label, match.group("key"))
+
+    def find(self, key, default_label: str):
+        """Find a config value for a key, returning MISSING if there isn't one.
+
+        This is format() for template targets with defaults, where misses are
+        expected, so a missing config key doesn't cost an exception.
+
+        Returns:
+        --------
+        The config value, or configerus.shared.MISSING if the key (or label)
+        could not be found.
+
+        Raises:
+        -------
+        KeyError if the key could not be interpreted.
+        """
+        match = self.pattern.fullmatch(key.strip())
+        if not match:
+            raise KeyError(
+                "Could not interpret Format action key '{}'".format(key)
+            )
+
+        label = match.group("label")
+        key = match.group("key")
+
+        if label is None:
+            label = default_label
+
+        self.config.record_dependency(DEPENDENCY_LABEL, label)
+        try:
+            loaded = self.config.load(label)
+        except KeyError:
+            # a missing label is rare enough to be left to the exception
+            return MISSING
+        return loaded.find(key)
+
+    def format_many(
+        self, keys: List[str], default_label: str
+    ) -> Dict[str, Any]:
+        """Find config values for many keys at once.
+
+        Keys are grouped by label, each label is loaded once, and the values
+        for each label are read with a single Loaded.get_many().
+
+        Returns:
+        --------
+        Dict of key to the config value, or configerus.shared.MISSING if the
+        key (or label) could not be found.  Keys which can't be interpreted,
+        and keys for labels which fail to format, are left out so that they
+        are formatted (and raise) one at a time.
+        """
+        labels: Dict[str, Dict[str, str]] = {}
+        for key in keys:
+            match = self.pattern.fullmatch(key.strip())
+            if not match:
+                continue
+            label = match.group("label")
+            if label is None:
+                label = default_label
+            labels.setdefault(label, {})[key] = match.group("key")
+
+        values: Dict[str, Any] = {}
+        for label, label_keys in labels.items():
+            self.config.record_dependency(DEPENDENCY_LABEL, label)
+            try:
+                loaded = self.config.load(label)
+            except KeyError:
+                values.update({key: MISSING for key in label_keys})
+                continue
+
+            try:
+                found = loaded.get_many(
+                    label_keys.values(),
+                    defaults=[MISSING] * len(label_keys),
+                    as_tuple=True,
+                )
+            except KeyError as err:
+                logger.debug("Could not get many from '%s': %s", label, err)
+                continue
+            values.update(zip(label_keys, found))
+        return values
+
     def format(self, key, default_label: str):
         """Format a key by returning config values.
 
@@ -57,8 +157,6 @@ class ConfigFormatGetPlugin:
         if label is None:
             label = default_label
 
-        if label is None:
-            label = default_label
-
+        self.config.record_dependency(DEPENDENCY_LABEL, label)
         loaded = self.config.load(label)
         return loaded.get(key)
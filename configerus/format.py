@@ -2,17 +2,33 @@
 
 Config formatting code.
 
-@NOTE this code has gone through three major iterations, starting with a single
-  function, expanded to be module, expanded further with regex, expanded again
-  with centralized processing using regex, and finally this parser.  Some
-  of the comments may be out of date.
+@NOTE this code has gone through several major iterations, starting with a
+  single function, expanded to be module, expanded further with regex,
+  expanded again with centralized processing using regex, then a stack parser,
+  and finally templates which are compiled once and then evaluated.  Some of
+  the comments may be out of date.
 
 """
 import logging
-from typing import Any, Dict, List
-from enum import Enum
-
+import functools
+import re
+import threading
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .instances import PluginInstance
 from .plugin import Type
+from .shared import FrozenDict, FrozenList, MISSING
 
 logger = logging.getLogger("configerus.format")
 
@@ -33,74 +49,233 @@ FORMATTER_SPECIAL_VALUES: Dict[str, Any] = {
 """ A map of interpation values for the interpet target """
 
 
-class ParserState(Enum):
-    """What the parser currently thinks it is looking at."""
+TEMPLATE_CACHE_SIZE = 4096
+""" How many compiled template strings to keep (@see compile_template()) """
 
-    OUTSIDE = 0  # we are outside of a matching pattern
-    START = 1  # we are inside a matching pattern, either a plugin or a target
-    KEY = 2  # we know we are in a target key name
-    IGNORE = 3  # we are ignoring the current context
+TEMPLATE_START = "{{"
+TEMPLATE_STOP = "}}"
+TEMPLATE_PLUGINEND = "::"
+TEMPLATE_DEFAULT = "?"
 
 
-class ParserStackNode:
-    """Node in the stack.
+class TemplateTag:
+    """A compiled template tag.
 
-    We parse a string using a language stack.
+    `{{plugin::key?default}}` compiles to a tag with plugin, key and fallback
+    parts.  Parts are lists of str literals and nested TemplateTags.
     """
 
-    def __init__(self, parent, state=ParserState.OUTSIDE):
-        """Initialize the language stack node.
+    def __init__(self):
+        """Initialize an empty tag."""
+        self.plugin: Optional[List[Any]] = None
+        """ parts of the plugin prefix, or None to use the default plugin """
 
-        Parameters:
-        -----------
-        parent (node) : a stack needs to know its parent for popping
-        state (State) : every node corresponds to a single state
-        """
-        self.parent = parent
-        self.state = state
+        self.key: List[Any] = []
+        """ parts of the target key """
 
-        self.plugin = None
-        self.key = None
-        """ some nodes track information collected for interpretation """
+        self.fallback: Optional[TemplateTag] = None
+        """ tag for the text after `?`, used if the target can't be found.
+        Its plugin defaults to the passthrough plugin, and it can have its
+        own fallback. """
 
-        self.parts = []
-        """ list of subject parts that are a part of this node """
+    def __repr__(self):
+        """Show the tag structure, for debugging."""
+        return "TemplateTag(plugin={}, key={}, fallback={})".format(
+            self.plugin, self.key, self.fallback
+        )
 
-    def push(self, state):
-        """Push a state child and return it."""
-        return ParserStackNode(parent=self, state=state)
 
-    def pop(self):
-        """Get the node parent."""
-        return self.parent
+class _TemplateFrame:
+    """An open tag while compiling."""
 
-    def __str__(self):
-        """Write to a string for debugging."""
-        return "{}:{}[{}][p:{},k:{}]".format(
-            self.parent, self.state.value, self.join(), self.plugin, self.key
-        )
+    def __init__(self, parts: List[Any]):
+        """Start a tag which will be added to parts."""
+        self.parts = parts
+        """ parts that the tag belongs in """
 
-    def join(self):
-        """Join the parts back together.
+        self.tag = TemplateTag()
+        self.target = self.tag
+        """ the tag (or fallback tag) that is collecting parts """
 
-        Returns:
-        --------
-        If only 1 item is in the node, then it is returned raw, otherwise we
-        return a string joing of all of the parts.
+        self.raw: List[Any] = [TEMPLATE_START]
+        """ everything in the tag as literal parts, for unclosed tags """
 
-        @NOTE this can result in false identities when comparing dicts as
-            strings to things like json, as Python uses single quotes, but
-            JSON uses double.
 
-        """
-        if len(self.parts) == 1:
-            return self.parts[0]
+TEMPLATE_TOKEN_PATTERN = re.compile(r"(\{\{|\}\}|::|\?)")
+""" Matches all of the template tokens, leftmost first, keeping the tokens
+when splitting """
+
+
+def tokenize_template(subject: str) -> List[str]:
+    """Split a template string into tokens and text, dropping empty text.
+
+    This is a single pass over the string, and text between the tokens is
+    kept as it is, whatever it contains.
+    """
+    return [part for part in TEMPLATE_TOKEN_PATTERN.split(subject) if part]
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(subject: str) -> Tuple[Any, ...]:
+    """Compile a template string into literal parts and TemplateTags.
+
+    Compiled templates are kept in a bounded LRU cache, as config tends to
+    format the same template strings over and over.  They must not be
+    changed.
+
+    `::` and `?` outside of tags are literal text, as are tags which are
+    never closed.
+
+    Parameters:
+    -----------
+    subject (str) : template string
+
+    Returns:
+    --------
+    Tuple of str literals and TemplateTags
+
+    Raises:
+    -------
+    ValueError if a tag is closed that was never opened.
+    """
+    parts: List[Any] = []
+    stack: List[_TemplateFrame] = []
+
+    for token in tokenize_template(subject):
+        if token == TEMPLATE_START:
+            stack.append(
+                _TemplateFrame(stack[-1].target.key if stack else parts)
+            )
+            continue
+
+        if not stack:
+            if token == TEMPLATE_STOP:
+                raise ValueError(
+                    f"Unexpected tag end in template string : {subject}"
+                )
+            parts.append(token)
+            continue
+
+        frame = stack[-1]
+        if token == TEMPLATE_STOP:
+            stack.pop()
+            frame.parts.append(frame.tag)
+            if stack:
+                stack[-1].raw.append(frame.tag)
+            continue
+
+        frame.raw.append(token)
+        if token == TEMPLATE_PLUGINEND:
+            # the key so far was the plugin
+            frame.target.plugin = frame.target.key
+            frame.target.key = []
+        elif token == TEMPLATE_DEFAULT:
+            frame.target.fallback = TemplateTag()
+            frame.target = frame.target.fallback
+        else:
+            frame.target.key.append(token)
+
+    # unclosed tags are left as text, in the parts where they started
+    while stack:
+        frame = stack.pop()
+        frame.parts.extend(frame.raw)
+        if stack:
+            stack[-1].raw.extend(frame.raw)
+
+    return tuple(parts)
+
+
+def tag_targets(
+    parts: Sequence[Any],
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """List the (plugin, key) targets of the tags in a compiled template.
+
+    Tag defaults (after `?`) are left out, as they are only evaluated if the
+    target can't be found.  Targets built from other tags can't be known
+    without formatting, so they are listed with a None key, after the targets
+    of the tags that build them.
+
+    Parameters:
+    -----------
+    parts (Sequence[Any]) : compiled template (@see compile_template())
+
+    Returns:
+    --------
+    List of (plugin, key) in the order that they are found.  The plugin is
+    None for tags which don't give one.
+    """
+    targets: List[Tuple[Optional[str], Optional[str]]] = []
+    # each entry is (tag, whether the tags that build it are listed)
+    stack = [
+        (part, False)
+        for part in reversed(parts)
+        if isinstance(part, TemplateTag)
+    ]
+    while stack:
+        tag, built = stack.pop()
+        nested = [
+            part
+            for part in (tag.plugin or []) + tag.key
+            if isinstance(part, TemplateTag)
+        ]
+        if not nested:
+            plugin = "".join(tag.plugin) if tag.plugin is not None else None
+            targets.append((plugin, "".join(tag.key)))
+        elif built:
+            targets.append((None, None))
+        else:
+            stack.append((tag, True))
+            stack += [(part, False) for part in reversed(nested)]
+    return targets
+
+
+def template_free_nodes(data: Any) -> Dict[int, Any]:
+    """Find the lists and dicts in a tree which hold no templates.
+
+    Parameters:
+    -----------
+    data (Any) : data tree
+
+    Returns:
+    --------
+    Dict of id() to node for every list and dict with no template strings
+    anywhere below it.  The nodes are kept so that an id can't be mistaken
+    for a node which has the same id later.  The flags are only right for as
+    long as the nodes aren't changed, so only flag frozen data.
+    """
+    free: Dict[int, Any] = {}
+    if not isinstance(data, (list, dict)):
+        return free
+
+    # each frame is [container, its values, has templates]
+    stack = [[data, iter(_container_values(data)), False]]
+    while stack:
+        frame = stack[-1]
+        for value in frame[1]:
+            if isinstance(value, (list, dict)):
+                stack.append([value, iter(_container_values(value)), False])
+                break
+            if isinstance(value, str) and TEMPLATE_START in value:
+                frame[2] = True
+        else:
+            stack.pop()
+            if frame[2]:
+                if stack:
+                    stack[-1][2] = True
+            else:
+                free[id(frame[0])] = frame[0]
+    return free
+
+
+def _container_values(container: Any):
+    """Get the values of a list or dict."""
+    if isinstance(container, list):
+        return container
+    return container.values()
 
-        return "".join(["{}".format(part) for part in self.parts])
 
-    def append(self, part):
-        """Append a part to the node."""
-        self.parts.append(part)
+_CONTAINER_END = object()
+""" marks the end of a container in a format walk (@see Formatter._walk()) """
 
 
 class Formatter:
@@ -129,171 +304,380 @@ class Formatter:
         self.special_values: Dict[str, Any] = FORMATTER_SPECIAL_VALUES
         """Special formatter key values."""
 
-    def format(self, data: Any, default_label: str):
-        """Perform a deep format."""
-        return self.recursive_format(data=data, default_label=default_label)
-
-    def recursive_format(self, data: Any, default_label: str):
-        """Perform recursive deep formatting."""
-        # try to iterate across the target
-        # There is probably a more `python` approach that would cover more
-        # iterables, as long as we can re-assign
-        if isinstance(data, list):
-            for index, value in enumerate(data):
-                data[index] = self.recursive_format(
-                    data=value, default_label=default_label
-                )
-        if isinstance(data, dict):
-            for index, value in data.items():
-                data[index] = self.recursive_format(
-                    data=value, default_label=default_label
+        self.passes = threading.local()
+        """ per-thread state of the format() pass in progress, which keeps
+        the replacement memo for the pass (@see format()) """
+
+        self.dispatch: Dict[str, PluginInstance] = {}
+        """ formatter plugin name to plugin instance, so that finding the
+        plugin for a tag is a dict lookup (@see refresh_dispatch()) """
+
+        self.batch_plugins: Set[str] = set()
+        """ names of the formatter plugins which can format many targets at
+        once (@see batch_format()) """
+
+        self.dispatch_version: Optional[int] = None
+        """ version of the config plugin list that dispatch was built from
+        (@see PluginInstances.version) """
+
+        self.refresh_dispatch()
+
+    def refresh_dispatch(self):
+        """Rebuild the dispatch table if the config plugins have changed.
+
+        format() does this at the start of each pass, so plugins added or
+        removed through config.plugins are picked up.
+        """
+        version = self.config.plugins.version
+        if version == self.dispatch_version:
+            return
+        self.dispatch = self.dispatch_table()
+        self.batch_plugins = {
+            name
+            for name, instance in self.dispatch.items()
+            if hasattr(instance.plugin, "format_many")
+        }
+        self.dispatch_version = version
+
+    def format(
+        self,
+        data: Any,
+        default_label: str,
+        template_free: Optional[Dict[int, Any]] = None,
+    ):
+        """Perform a deep format.
+
+        Each distinct (plugin, key, default_label) template target is only
+        resolved once per pass.  Replacements are kept in a memo until the
+        outermost format() finishes, and format() calls made while resolving
+        (such as getting config which has its own templates) share it.
+
+        The data is walked once, compiling its template strings, then the
+        template targets for plugins which can format many targets at once
+        are resolved in batches (@see batch_format()) before the templates
+        are evaluated.
+        """
+        memo = getattr(self.passes, "memo", None)
+        outermost = memo is None
+        if outermost:
+            self.refresh_dispatch()
+            memo = self.passes.memo = {}
+        try:
+            steps, templates = self._walk(data, template_free)
+            if not templates:
+                return data
+            self.batch_format(templates, default_label, memo)
+            return self._evaluate_walk(steps, default_label)
+        finally:
+            if outermost:
+                self.passes.memo = None
+
+    def batch_format(
+        self,
+        templates: Iterable[Sequence[Any]],
+        default_label: str,
+        memo: Dict[Tuple[str, str, str], Tuple[Any, FrozenSet]],
+    ):
+        """Resolve the targets of some compiled templates in batches.
+
+        Formatter plugins may have a method:
+
+            format_many(keys: List[str], default_label: str) -> Dict[str, Any]
+
+        which resolves many keys at once, returning the replacement for each
+        key, or MISSING if the target doesn't exist.  Keys that it leaves out
+        are formatted one at a time as usual.
+
+        Only targets which can be known without formatting anything are
+        batched, and targets of tag defaults are left alone, as those are
+        only evaluated if they are needed.  Plugins with only one target are
+        left to format it as usual.
+
+        Parameters:
+        -----------
+        templates (Iterable[Sequence]) : compiled templates
+            (@see compile_template())
+
+        memo (Dict) : replacement memo for the pass, which is given the
+            batched replacements.  Targets already in it are not batched.
+        """
+        if not self.batch_plugins:
+            return
+
+        groups: Dict[str, List[str]] = {}
+        for plugin, key in self.gather_targets(templates):
+            if (plugin, key, default_label) not in memo:
+                groups.setdefault(plugin, []).append(key)
+
+        for plugin, keys in groups.items():
+            if len(keys) < 2 or plugin not in self.batch_plugins:
+                continue
+            plugin_instance = self.format_plugin(plugin)
+            try:
+                # each replacement is taken to depend on the whole batch
+                with self.config.track_dependencies() as dependencies:
+                    replacements = plugin_instance.format_many(
+                        keys=keys, default_label=default_label
+                    )
+            except KeyError as err:
+                logger.debug("Batch format for '%s' failed: %s", plugin, err)
+                continue
+            dependencies = frozenset(dependencies)
+            for key, replacement in replacements.items():
+                memo[(plugin, key, default_label)] = (
+                    replacement,
+                    dependencies,
                 )
 
-        # strings get some searching for format actions
-        elif isinstance(data, str):
-            # if the entire target is the match, then replace whatever type
-            # we get out of the config .get() call
-            data = self.format_string(
-                subject=data, default_label=default_label
-            )
+    def gather_targets(
+        self, templates: Iterable[Sequence[Any]]
+    ) -> List[Tuple[str, str]]:
+        """List the static (plugin, key) targets of some compiled templates.
 
-        else:
-            # all sorts of primitives and custom objects are just ignored.
-            pass
+        Targets built from other tags, targets of the passthrough plugins and
+        targets of tag defaults are left out.
 
-        return data
+        Returns:
+        --------
+        List of distinct (plugin, key) in the order that they are found
+        """
+        targets: Dict[Tuple[str, str], None] = {}
+        for parts in templates:
+            for plugin, key in tag_targets(parts):
+                if key is None:
+                    continue
+                if plugin is None:
+                    plugin = self.default_plugin_for_target
+                if key and plugin not in [
+                    FORMATTER_PLUGIN_ID_PASSTHROUGH,
+                    FORMATTER_PLUGIN_ID_INTEPRET,
+                ]:
+                    targets[(plugin, key)] = None
+        return list(targets)
+
+    def recursive_format(
+        self,
+        data: Any,
+        default_label: str,
+        template_free: Optional[Dict[int, Any]] = None,
+    ):
+        """Perform recursive deep formatting.
+
+        The data is not modified.  New lists and dicts are only created along
+        paths where something was formatted, other subtrees are returned as
+        they are.  FrozenList and FrozenDict data stay frozen.
+
+        Despite the name, this walks the data with an explicit stack, so deep
+        trees don't hit the recursion limit.
+
+        Parameters:
+        -----------
+        data (Any) : data to format
+
+        default_label (str) : label for templates which don't give one
+
+        template_free (Dict[int, Any]) : lists and dicts known to hold no
+            templates (@see template_free_nodes()) which are returned without
+            being walked.
+        """
+        steps, templates = self._walk(data, template_free)
+        if not templates:
+            return data
+        return self._evaluate_walk(steps, default_label)
+
+    @staticmethod
+    def _walk(
+        data: Any, template_free: Optional[Dict[int, Any]]
+    ) -> Tuple[List[Tuple[Any, Any]], List[Sequence[Any]]]:
+        """Walk data once, compiling its template strings.
+
+        Returns:
+        --------
+        The steps of the walk in post order, and the compiled templates.  Each
+        step is (value, compiled template or None) for a leaf, or
+        (container, _CONTAINER_END) after all of the values of a container.
+        Template-free containers are leaves.
+        """
+        steps: List[Tuple[Any, Any]] = []
+        templates: List[Sequence[Any]] = []
+        # each frame is (container, its values)
+        stack: List[Tuple[Any, Iterator[Any]]] = []
+        value = data
+        while True:
+            if isinstance(value, (list, dict)) and not (
+                template_free and template_free.get(id(value)) is value
+            ):
+                stack.append((value, iter(_container_values(value))))
+            else:
+                parts = None
+                if isinstance(value, str) and TEMPLATE_START in value:
+                    parts = compile_template(value)
+                    templates.append(parts)
+                steps.append((value, parts))
+
+            # move on to the next value, closing finished containers
+            while stack:
+                container, values = stack[-1]
+                value = next(values, _CONTAINER_END)
+                if value is not _CONTAINER_END:
+                    break
+                stack.pop()
+                steps.append((container, _CONTAINER_END))
+            else:
+                return steps, templates
+
+    def _evaluate_walk(self, steps: List[Tuple[Any, Any]], default_label: str):
+        """Evaluate the templates from a walk, and rebuild the data.
+
+        @see _walk()
+        """
+        values: List[Any] = []
+        for value, parts in steps:
+            if parts is _CONTAINER_END:
+                start = len(values) - len(value)
+                formatted = self._rebuild_container(value, values[start:])
+                del values[start:]
+                values.append(formatted)
+            elif parts is None:
+                values.append(value)
+            else:
+                values.append(self._evaluate_parts(parts, default_label))
+        return values[0]
+
+    @staticmethod
+    def _rebuild_container(container: Any, values: List[Any]):
+        """Rebuild a list or dict from formatted values, if any changed."""
+        if isinstance(container, list):
+            if any(new is not old for new, old in zip(values, container)):
+                if isinstance(container, FrozenList):
+                    return FrozenList(values)
+                return values
+            return container
+
+        if any(
+            new is not old for new, old in zip(values, container.values())
+        ):
+            formatted_dict = dict(zip(container.keys(), values))
+            if isinstance(container, FrozenDict):
+                return FrozenDict(formatted_dict)
+            return formatted_dict
+        return container
 
-    # Not sure how to reduce branching here. This is the primary stack
-    # processing method.
-    # pylint: disable=too-many-branches
     def format_string(self, subject: str, default_label: str):
         """Format subject string.
 
-        Looks for and processes any formatting tags in the subject.
+        Looks for and processes any formatting tags in the subject.  The
+        subject is compiled once (@see compile_template()) and the compiled
+        template is evaluated.
+
+        Returns:
+        --------
+        If the subject is a single tag, then the raw replacement, otherwise a
+        string.
         """
         # fast stop test.  if no start tags are in the string then just abort
         if self.START_MATCH not in subject:
             return subject
 
-        subject_tokenized = subject
-        for token in [
-            self.START_MATCH,
-            self.STOP_MATCH,
-            self.PLUGINEND_MATCH,
-            self.DEFAULT_MATCH,
-        ]:
-            subject_tokenized = subject_tokenized.replace(
-                token, "@@@{}@@@".format(token)
-            )
-        # subject string split/exploded into words
-        subject_parts: List[str] = subject_tokenized.split("@@@")
+        return self._evaluate_parts(compile_template(subject), default_label)
 
-        stack = ParserStackNode(parent=None, state=ParserState.OUTSIDE)
-        # print ("PRE: {} => {}".format(subject, subject_parts))
+    def _evaluate_parts(self, parts: Sequence[Any], default_label: str):
+        """Evaluate compiled template parts.
 
-        for part in subject_parts:
+        Returns:
+        --------
+        If there is only 1 part, then it is returned raw, otherwise we return
+        a string joining all of the parts.
 
-            if part == "":
-                # print("SKIP EMPTY -> {}".format(part))
-                continue
+        @NOTE this can result in false identities when comparing dicts as
+            strings to things like json, as Python uses single quotes, but
+            JSON uses double.
+        """
+        values = [
+            self._evaluate_tag(part, default_label)
+            if isinstance(part, TemplateTag)
+            else part
+            for part in parts
+        ]
+        if len(values) == 1:
+            return values[0]
+        return "".join(["{}".format(value) for value in values])
+
+    def _evaluate_tag(
+        self, tag: TemplateTag, default_label: str, default_plugin: str = ""
+    ):
+        """Find the replacement for a compiled tag."""
+        plugin = (
+            self._evaluate_parts(tag.plugin, default_label)
+            if tag.plugin is not None
+            else default_plugin or self.default_plugin_for_target
+        )
+        key = self._evaluate_parts(tag.key, default_label)
 
-            if part in [self.START_MATCH]:
-                stack = stack.push(ParserState.START)
-                stack.plugin = self.default_plugin_for_target
-                # print("START: '{}' :: {}".format(part, stack))
-
-            elif part in [self.STOP_MATCH]:
-
-                if stack.state is ParserState.START:
-                    # we had started a tag, we had collected only a tag key
-                    # and now we see s stop tag, so assume that is all we get
-                    key = stack.join()
-                    stack = stack.pop()
-                    plugin = (
-                        stack.plugin
-                        if stack.plugin is not None
-                        else self.default_plugin_for_target
-                    )
+        replace = self._resolve_target(
+            plugin, key, default_label, tag.fallback is None
+        )
+        if replace is not MISSING:
+            return replace
+        # the fallback is only evaluated if it is needed
+        return self._evaluate_tag(
+            tag.fallback, default_label, self.default_plugin_for_default
+        )
 
-                    replace = self.find_replacement(
-                        plugin, key, default_label=default_label
-                    )
-                    stack.append(replace)
-                    # print("STOP: (start) '{}' :: {}".format(part, stack))
-
-                elif stack.state is ParserState.KEY:
-                    # we had started a tag, and had collected
-                    key = stack.join()
-                    stack = stack.pop()
-                    plugin = (
-                        stack.plugin
-                        if stack.plugin is not None
-                        else self.default_plugin_for_target
-                    )
+    def _resolve_target(
+        self, plugin: str, key: Any, default_label: str, required: bool
+    ):
+        """Find the replacement for a target, once per format() pass.
 
-                    replace = self.find_replacement(
-                        plugin, key, default_label=default_label
-                    )
-                    stack.append(replace)
-                    # print("STOP: (key) '{}' :: {}".format(part, stack))
+        Replacements are kept with the dependencies that were recorded while
+        finding them, and a kept replacement records the same dependencies
+        again, so kept formatted values know everything that they read.
 
-                elif stack.state is ParserState.IGNORE:
-                    # we are ignoring this stuff
-                    stack = stack.pop()
-                    # print("STOP: (ignore) '{}' :: {}".format(part, stack))
+        Parameters:
+        -----------
+        required (bool) : if the tag has no default, in which case a missing
+            target raises instead of giving MISSING.
 
-                else:
-                    # print("STOP: (what's this)'{}'::{}".format(part, stack))
-                    raise ValueError("Unexpected tag end : {}".format(stack))
-
-            elif stack.state in [ParserState.IGNORE]:
-                # If we are in an ignore state, only track tag start and stop
-                # so skip everything below
-                # print("IGNORING: {}".format(part))
-                pass
-
-            elif part in [self.PLUGINEND_MATCH]:
-                plugin = stack.join()
-                stack = stack.pop()
-
-                stack.plugin = plugin
-                stack = stack.push(ParserState.KEY)
-                # print("PLUGIN: '{}' :: {}".format(part, stack))
-
-            elif part in [self.DEFAULT_MATCH]:
-                key = stack.join()
-                stack = stack.pop()
-
-                stack.key = key
-                plugin = (
-                    stack.plugin
-                    if stack.plugin is not None
-                    else self.default_plugin_for_target
-                )
+        Returns:
+        --------
+        The replacement, or MISSING if the target is not required and could
+        not be found.
+        """
+        memo = getattr(self.passes, "memo", None)
+        if (
+            memo is None
+            or not isinstance(key, str)
+            or not isinstance(plugin, str)
+            or plugin
+            in [
+                FORMATTER_PLUGIN_ID_PASSTHROUGH,
+                FORMATTER_PLUGIN_ID_INTEPRET,
+            ]
+        ):
+            if required:
+                return self.find_replacement(plugin, key, default_label)
+            return self.find_replacement_or_missing(
+                plugin, key, default_label
+            )
 
-                try:
-                    replace = self.find_replacement(
-                        plugin, key, default_label=default_label
+        memo_key = (plugin, key, default_label)
+        if memo_key in memo:
+            replace, dependencies = memo[memo_key]
+            self.config.record_dependencies(dependencies)
+        else:
+            with self.config.track_dependencies() as dependencies:
+                if required:
+                    replace = self.find_replacement(plugin, key, default_label)
+                else:
+                    replace = self.find_replacement_or_missing(
+                        plugin, key, default_label
                     )
-                    stack.append(replace)
-
-                    # if the replacement retrieval did not throw an exception
-                    # then ignore the rest of the tag
-                    stack = stack.push(ParserState.IGNORE)
-                    # print(f"DEFAULT:IGNORING'{part}'::{stack}")
-                except KeyError:
-                    # if retrieving a replacement raised an exception then we
-                    # switch into DEFAULT mode
-                    stack.plugin = self.default_plugin_for_default
-                    stack = stack.push(ParserState.START)
-                    # print(f"DEFAULT: PROCESSING DEFAULT '{part}' :: {stack}")
-
-            else:
-                stack.append(part)
-                # print("INC: {}".format(part))
+            memo[memo_key] = (replace, frozenset(dependencies))
 
-        # print("DONE:  {}".format(stack))
-        return stack.join()
+        if replace is MISSING and required:
+            # let the plugin raise the right exception
+            return self.find_replacement(plugin, key, default_label)
+        return replace
 
     def find_replacement(self, plugin: str, key: str, default_label: str):
         """Use a plugin and key to find a replacement."""
@@ -307,19 +691,45 @@ class Formatter:
             # In this case interpret the value as something special
             return self.interpret(key)
 
-        if self.config.plugins.has_plugin(
-            instance_id=plugin, type=Type.FORMATTER
-        ):
-            plugin = self.config.plugins.get_plugin(
-                instance_id=plugin, type=Type.FORMATTER
-            )
-        elif self.config.plugins.has_plugin(
-            plugin_id=plugin, type=Type.FORMATTER
-        ):
-            plugin = self.config.plugins.get_plugin(
-                plugin_id=plugin, type=Type.FORMATTER
-            )
-        else:
+        return self.format_plugin(plugin).format(
+            key=key, default_label=default_label
+        )
+
+    def find_replacement_or_missing(
+        self, plugin: str, key: str, default_label: str
+    ):
+        """Find a replacement for a tag with a default.
+
+        Plugins which have a find() method return MISSING for misses, so the
+        miss doesn't cost an exception.  For other plugins a KeyError is
+        caught, as it is for errors that find() raises while formatting what
+        it found.
+
+        Returns:
+        --------
+        The replacement, or MISSING if the plugin could not find one
+        """
+        if plugin in [
+            FORMATTER_PLUGIN_ID_PASSTHROUGH,
+            FORMATTER_PLUGIN_ID_INTEPRET,
+        ]:
+            return self.find_replacement(plugin, key, default_label)
+
+        plugin_instance = self.format_plugin(plugin)
+        try:
+            if hasattr(plugin_instance, "find"):
+                return plugin_instance.find(
+                    key=key, default_label=default_label
+                )
+            return plugin_instance.format(key=key, default_label=default_label)
+        except KeyError:
+            return MISSING
+
+    def format_plugin(self, plugin: str) -> object:
+        """Get a formatter plugin by instance_id or plugin_id."""
+        try:
+            return self.dispatch[plugin].plugin
+        except KeyError as err:
             logger.error(
                 [
                     instance.instance_id
@@ -329,9 +739,26 @@ class Formatter:
             raise RuntimeError(
                 f"Unknown format plugin '{Type.FORMATTER.value}::{plugin}', "
                 "no such plugin has been added."
-            )
+            ) from err
+
+    def dispatch_table(self) -> Dict[str, PluginInstance]:
+        """Map formatter plugin names to the plugin instances to use.
+
+        A name matches the highest priority plugin with that instance_id, or
+        if there isn't one, the highest priority plugin with that plugin_id.
 
-        return plugin.format(key=key, default_label=default_label)
+        Instances are kept instead of plugin objects, as instances can hand
+        out a new plugin object if their plugin is shared (@see
+        PluginInstance.plugin)
+        """
+        by_instance_id: Dict[str, PluginInstance] = {}
+        by_plugin_id: Dict[str, PluginInstance] = {}
+        for instance in self.config.plugins.get_instances(
+            type=Type.FORMATTER
+        ):
+            by_instance_id.setdefault(instance.instance_id, instance)
+            by_plugin_id.setdefault(instance.plugin_id, instance)
+        return {**by_plugin_id, **by_instance_id}
 
     def interpret(self, key: str):
         """Interpret that value to mean something special."""
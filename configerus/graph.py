@@ -0,0 +1,268 @@
+"""
+
+Static template dependency analysis.
+
+Templates like `{{label:key}}` are only followed when a value is formatted,
+and a template which (directly or not) refers back to itself recurses until
+Python gives up.  Here we scan loaded config for template targets without
+formatting anything, and build a graph of which config keys refer to which
+other config keys.  The graph can report cycles up front, and give an order
+for the labels so that the labels that others refer to come first.
+
+Only targets that can be known without formatting are followed.  Targets which
+are themselves built from templates (`{{ {{variables:which}} }}`) can't be, so
+they are only counted (@see TemplateGraph.dynamic.)  Tag defaults (after `?`)
+are only formatted if the target can't be found, so they aren't followed.
+
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .format import TEMPLATE_START, compile_template, tag_targets
+
+logger = logging.getLogger("configerus.graph")
+
+TemplateNode = Tuple[str, str]
+""" A (label, dot notation key) location in config """
+
+
+def template_targets(
+    subject: str,
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Find the static (plugin, key) targets of the templates in a string.
+
+    The string is compiled as the formatter compiles it, @see
+    configerus.format.tag_targets()
+
+    Parameters:
+    -----------
+    subject (str) : string which may contain templates
+
+    Returns:
+    --------
+    List of (plugin, key) for every tag target, with a None plugin for tags
+    without one.  Targets built from other tags have a None key.
+    """
+    if TEMPLATE_START not in subject:
+        return []
+    try:
+        parts = compile_template(subject)
+    except ValueError:
+        # the formatter reports broken templates if they are formatted
+        logger.debug("Skipping broken template string: %s", subject)
+        return []
+    return tag_targets(parts)
+
+
+def tree_templates(data: Any, path: str = "") -> Iterable[Tuple[str, str]]:
+    """Walk a data tree, giving the dot notation path of each template string.
+
+    Parameters:
+    -----------
+    data (Any) : loaded data tree
+
+    path (str) : path of the data in its label
+
+    Returns:
+    --------
+    Iterable of (path, string) for all strings which contain "{{"
+    """
+    stack = [(path, data)]
+    while stack:
+        node_path, node = stack.pop()
+        if isinstance(node, dict):
+            items = node.items()
+        elif isinstance(node, list):
+            items = enumerate(node)
+        else:
+            if isinstance(node, str) and TEMPLATE_START in node:
+                yield node_path, node
+            continue
+
+        for index, value in items:
+            stack.append(
+                (f"{node_path}.{index}" if node_path else str(index), value)
+            )
+
+
+class TemplateGraph:
+    """Graph of the config keys which template strings refer to.
+
+    Nodes are (label, key) tuples.  Edges go from the location of a template
+    to the target of the template.  A target depends on all of the templates
+    at or below its key, as getting a key formats the whole subtree.
+    """
+
+    def __init__(self):
+        """Initialize an empty graph."""
+        self.templates: Dict[str, Set[str]] = {}
+        """ label to the keys of all templates in the label """
+
+        self.edges: Dict[TemplateNode, Set[TemplateNode]] = {}
+        """ template location to the template targets """
+
+        self.dynamic: int = 0
+        """ count of template targets which can't be known without formatting
+        """
+
+        self.missing: Set[str] = set()
+        """ labels which templates refer to, but which no source has """
+
+    def add_label(self, label: str, data: Any, targeter):
+        """Scan loaded data for a label, adding its templates to the graph.
+
+        Parameters:
+        -----------
+        label (str) : config label of the data
+
+        data (Any) : loaded data for the label
+
+        targeter (Callable) : function (plugin, key, label) -> (label, key)
+            which interprets a template target as a config location, or
+            returns None for targets which aren't config (files etc)
+        """
+        keys = self.templates.setdefault(label, set())
+        for key, subject in tree_templates(data):
+            keys.add(key)
+            for plugin, target in template_targets(subject):
+                if target is None:
+                    self.dynamic += 1
+                    continue
+                node = targeter(plugin, target, label)
+                if node is not None:
+                    self.edges.setdefault((label, key), set()).add(node)
+
+    def labels(self) -> Set[str]:
+        """Get all labels that were scanned or are referred to."""
+        return set(self.templates).union(
+            node[0] for nodes in self.edges.values() for node in nodes
+        )
+
+    def dependencies(self, node: TemplateNode) -> Set[TemplateNode]:
+        """Get the template locations that formatting a node would format.
+
+        Parameters:
+        -----------
+        node (TemplateNode) : (label, key) template location
+
+        Returns:
+        --------
+        The template locations which are targets of the templates at the node,
+        or are below those targets.
+        """
+        dependencies: Set[TemplateNode] = set()
+        for label, target in self.edges.get(node, set()):
+            prefix = f"{target}." if target else ""
+            dependencies.update(
+                (label, key)
+                for key in self.templates.get(label, set())
+                if key == target or key.startswith(prefix)
+            )
+        return dependencies
+
+    def cycles(self) -> List[List[TemplateNode]]:
+        """Find templates that refer back to themselves.
+
+        Returns:
+        --------
+        Sorted list of cycles, each a sorted list of the template locations
+        which refer to each other.  Formatting any of them would never finish.
+        """
+        dependencies = {node: self.dependencies(node) for node in self.edges}
+        return sorted(
+            sorted(component)
+            for component in strongly_connected(
+                dependencies, lambda node: dependencies.get(node, set())
+            )
+            if len(component) > 1
+            or component[0] in dependencies.get(component[0], set())
+        )
+
+    def label_order(self) -> List[str]:
+        """Order labels so that labels come after the labels they refer to.
+
+        Labels which refer to each other (without a key level cycle) are kept
+        together in label order.
+
+        Returns:
+        --------
+        List[str] of all of the labels in the graph
+        """
+        label_edges: Dict[str, Set[str]] = {
+            label: set() for label in sorted(self.labels())
+        }
+        for (label, _), nodes in self.edges.items():
+            label_edges[label].update(
+                target_label
+                for target_label, _ in nodes
+                if not target_label == label
+            )
+
+        order: List[str] = []
+        for component in strongly_connected(
+            label_edges, lambda label: label_edges[label]
+        ):
+            order += sorted(component)
+        return order
+
+
+def strongly_connected(nodes: Iterable, edges) -> List[List[Any]]:
+    """Find the strongly connected components of a directed graph.
+
+    An iterative version of Tarjan's algorithm, so that deep graphs don't hit
+    the recursion limit.
+
+    Parameters:
+    -----------
+    nodes (Iterable) : nodes to start from
+
+    edges (Callable) : function which gives the nodes that a node points to
+
+    Returns:
+    --------
+    List of components, each a list of nodes.  Components come after all of
+    the components that they point to.
+    """
+    index: Dict[Any, int] = {}
+    lowlink: Dict[Any, int] = {}
+    on_stack: Set[Any] = set()
+    stack: List[Any] = []
+    components: List[List[Any]] = []
+
+    for root in nodes:
+        if root in index:
+            continue
+
+        work = [(root, iter(edges(root)))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges(child))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+    return components
+
@@ -0,0 +1,156 @@
+"""
+
+Flat indexes of loaded config.
+
+Getting a key normally walks down the data tree one step at a time.  For big
+labels that are read by full key, a flat index of every path in the tree
+turns each get into a single dict lookup.
+
+A key trie lists the keys under a prefix without walking (or formatting) the
+rest of the tree.
+
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("configerus.index")
+
+
+def tree_index(data: Any) -> Dict[Tuple[Any, ...], Any]:
+    """Index every node of a data tree by its path.
+
+    Parameters:
+    -----------
+    data (Any) : loaded data tree
+
+    Returns:
+    --------
+    Dict of path tuple (as in KeyPath) to node, for every dict and list
+    child in the tree.  List indexes are str steps, as they would be in
+    a dot notation key.  The root is not included.
+    """
+    index: Dict[Tuple[Any, ...], Any] = {}
+    stack = [((), data)]
+    while stack:
+        path, node = stack.pop()
+        if isinstance(node, dict):
+            items = node.items()
+        elif isinstance(node, list):
+            items = ((str(step), value) for step, value in enumerate(node))
+        else:
+            continue
+
+        for step, value in items:
+            child_path = path + (step,)
+            index[child_path] = value
+            stack.append((child_path, value))
+
+    return index
+
+
+def index_covers(path: Any) -> bool:
+    """Check if a path is in the form that tree_index() keys paths in.
+
+    For such paths a miss in the index is a miss in the tree.  Other paths,
+    such as those with int steps or list indexes like "01", can still be in
+    the tree.
+
+    Parameters:
+    -----------
+    path (KeyPath) : reduced key path
+
+    Returns:
+    --------
+    True if the index can answer for the path
+    """
+    return all(
+        isinstance(step, str) and (index is None or str(index) == step)
+        for step, index in zip(path, path.indexes)
+    )
+
+
+class KeyTrie:
+    """Trie of all of the key paths in a data tree.
+
+    Each node is a step down the tree.  Leaves are the scalar values (and
+    empty dicts and lists) of the tree, so all of the keys under a prefix can
+    be listed by visiting only the branch for that prefix.
+    """
+
+    def __init__(self):
+        """Initialize an empty trie node."""
+        self.children: Dict[Any, "KeyTrie"] = {}
+        """ child nodes, keyed by step (list indexes as str steps) """
+
+        self.leaf: bool = False
+        """ True if this node is a value rather than a dict or list """
+
+        self.value: Any = None
+        """ the data value, for leaves """
+
+    def find(self, path: Tuple[Any, ...]) -> Optional["KeyTrie"]:
+        """Find the node for a path, or None if there isn't one."""
+        node = self
+        for step in path:
+            node = node.children.get(step)
+            if node is None:
+                return None
+        return node
+
+    def leaves(
+        self, path: Tuple[Any, ...] = ()
+    ) -> List[Tuple[Tuple[Any, ...], Any]]:
+        """List all of the leaves under this node.
+
+        Parameters:
+        -----------
+        path (Tuple) : path of this node, which is prepended to leaf paths
+
+        Returns:
+        --------
+        List of (path, value) for every leaf, in data order
+        """
+        leaves: List[Tuple[Tuple[Any, ...], Any]] = []
+        stack = [(path, self)]
+        while stack:
+            node_path, node = stack.pop()
+            if node.leaf:
+                leaves.append((node_path, node.value))
+                continue
+            stack.extend(
+                (node_path + (step,), child)
+                for step, child in reversed(node.children.items())
+            )
+        return leaves
+
+
+def tree_trie(data: Any) -> KeyTrie:
+    """Build a KeyTrie for a data tree.
+
+    Parameters:
+    -----------
+    data (Any) : loaded data tree
+
+    Returns:
+    --------
+    The root KeyTrie node
+    """
+    root = KeyTrie()
+    stack = [(root, data)]
+    while stack:
+        node, value = stack.pop()
+        if isinstance(value, dict) and value:
+            items = value.items()
+        elif isinstance(value, list) and value:
+            items = ((str(step), child) for step, child in enumerate(value))
+        else:
+            node.leaf = True
+            node.value = value
+            continue
+
+        for step, child_value in items:
+            child = KeyTrie()
+            node.children[step] = child
+            stack.append((child, child_value))
+
+    return root
@@ -7,7 +7,9 @@ tools for centrally managing plugins and lists of plugins.
 
 """
 import logging
-from typing import List
+import threading
+import weakref
+from typing import Callable, List, Optional
 
 from .plugin import Type
 
@@ -24,7 +26,7 @@ class PluginInstances:
         limited in reusability without dynamic construction and copying
     """
 
-    def __init__(self, plugin_factory):
+    def __init__(self, plugin_factory, plugin_copier=None):
         """Initialize the plugin.
 
         Parameters:
@@ -35,6 +37,13 @@ class PluginInstances:
             signature is:
                 plugin_factory(type, plugin_id, instance_id, priority)
 
+        plugin_copier (Callable) : optional function which copies a plugin for
+            this list.  If given, then copies of this list share plugin
+            objects copy-on-write.
+
+            signature is:
+                plugin_copier(plugin)
+
         """
         self.instances = []
         """ keep a list of all of the plugins as PluginInstance wrappers
@@ -45,11 +54,25 @@ class PluginInstances:
         self.plugin_factory = plugin_factory
         """ A factory method to produce new plugins """
 
+        self.plugin_copier = plugin_copier
+        """ A method to copy shared plugins for this list, if sharing """
+
+        self.version: int = 0
+        """ counts plugins being added and removed, so that anything built
+        from the list can tell when to build again """
+
     def copy(self, new_plugin_factory, plugin_copier):
         """Make a copy of this plugin list.
 
-        This copies the instance list and by copying every plugin, overriding
-        its config and adding it to the new list
+        This copies the instance list, giving every instance a copy of the
+        plugin, overriding its config.
+
+        If this list was given a plugin_copier then the plugins are not copied
+        right away.  Instead both lists share the plugin copy-on-write: the
+        copied instance copies the plugin when it first uses it, or when this
+        list's instance is about to use it.  This list's instances always
+        keep their plugin objects.  Otherwise every plugin is copied
+        immediately.
 
         Parameters:
         -----------
@@ -67,19 +90,20 @@ class PluginInstances:
 
         """
         # A new instance list which we will return after copying over plugin
-        instances_copy = PluginInstances(new_plugin_factory)
+        instances_copy = PluginInstances(new_plugin_factory, plugin_copier)
 
         for instance in self.instances:
-            plugin_copy = plugin_copier(instance.plugin)
-            instances_copy.instances.append(
-                PluginInstance(
+            if self.plugin_copier is None:
+                instance_copy = PluginInstance(
                     instance.type,
                     instance.plugin_id,
                     instance.instance_id,
                     instance.priority,
-                    plugin_copy,
+                    plugin_copier(instance.plugin),
                 )
-            )
+            else:
+                instance_copy = instance.share(plugin_copier)
+            instances_copy.instances.append(instance_copy)
         return instances_copy
 
     # pylint: disable=redefined-builtin
@@ -156,8 +180,41 @@ class PluginInstances:
             ) from err
 
         self.instances.append(instance)
+        self.version += 1
         return plugin
 
+    # pylint: disable=redefined-builtin
+    def remove_plugins(
+        self, plugin_id: str = "", instance_id: str = "", type: Type = None
+    ) -> List["PluginInstance"]:
+        """Remove all matching plugins from the list.
+
+        Parameters:
+        -----------
+        instance_id (str) : plugin Instance intance_id for matching
+        plugin_id (str) : plugin Instance plugin_id for matching
+        type (Type) : plugin Instance type for matching
+
+        All filter parameters are optional, but at least one is needed.
+
+        Returns:
+        --------
+        List of the removed PluginInstance objects
+        """
+        if not (plugin_id or instance_id or type):
+            raise KeyError("No filter was given for plugins to remove")
+
+        removed = self.get_instances(
+            plugin_id=plugin_id, instance_id=instance_id, type=type
+        )
+        self.instances = [
+            instance for instance in self.instances if instance not in removed
+        ]
+        self.version += 1
+        for instance in removed:
+            instance.unshare()
+        return removed
+
     def __len__(self) -> int:
         """Return how many plugin instances we have."""
         return len(self.instances)
@@ -367,9 +424,12 @@ class PluginInstances:
         return sorted_instances
 
 
-# pylint: disable=too-few-public-methods
 class PluginInstance:
-    """Struct for a plugin instance that also keeps metadata about the instance."""
+    """Struct for a plugin instance that also keeps metadata about the instance.
+
+    The plugin object can be shared with copies of the instance, in which case
+    it is copied (copy-on-write) the first time that it is used.
+    """
 
     # pylint: disable=too-many-arguments, redefined-builtin
     def __init__(
@@ -385,4 +445,108 @@ class PluginInstance:
         self.plugin_id = plugin_id
         self.instance_id = instance_id
         self.priority = priority
-        self.plugin = plugin
+
+        self._plugin = plugin
+        self._share: Optional[PluginShare] = None
+        """ set if the plugin object is shared with other instances """
+        self._copier: Optional[Callable] = None
+        """ used to copy the plugin when it is shared """
+
+    @property
+    def plugin(self):
+        """Get the plugin object, first stopping any sharing of it.
+
+        The instance that the plugin was made for keeps the object, which
+        the copies sharing it are first given their own copies of.  Any other
+        instance gets a copy.
+        """
+        share = self._share
+        if share is not None:
+            with share.lock:
+                if self._share is not None:
+                    self._unshare_plugin()
+        return self._plugin
+
+    @plugin.setter
+    def plugin(self, plugin):
+        """Replace the plugin object."""
+        self.unshare()
+        self._plugin = plugin
+
+    def share(self, plugin_copier: Callable) -> "PluginInstance":
+        """Make a copy of this instance which shares the plugin object.
+
+        Parameters:
+        -----------
+        plugin_copier (Callable) : copies the plugin for the new instance,
+            when the new instance first uses it, or when the instance that
+            owns the plugin is about to.
+
+        Returns:
+        --------
+        A new PluginInstance with the same metadata and a shared plugin
+        """
+        if self._share is None:
+            self._share = PluginShare(self)
+
+        instance_copy = PluginInstance(
+            self.type,
+            self.plugin_id,
+            self.instance_id,
+            self.priority,
+            self._plugin,
+        )
+        with self._share.lock:
+            instance_copy._share = self._share
+            instance_copy._copier = plugin_copier
+            self._share.sharers.add(instance_copy)
+        return instance_copy
+
+    def unshare(self):
+        """Stop sharing the plugin object, without using it."""
+        share = self._share
+        if share is not None:
+            with share.lock:
+                share.sharers.discard(self)
+                self._share = None
+                self._copier = None
+
+    def _unshare_plugin(self):
+        """Stop sharing the plugin object, so that it can be used.
+
+        The caller must hold the share lock.
+        """
+        share = self._share
+        if share.owner is self:
+            # the owner may change its plugin, so the copies go first
+            for sharer in list(share.sharers):
+                sharer._plugin = sharer._copier(sharer._plugin)
+                sharer._share = None
+                sharer._copier = None
+            share.sharers.clear()
+        else:
+            self._plugin = self._copier(self._plugin)
+            share.sharers.discard(self)
+        self._share = None
+        self._copier = None
+
+
+# pylint: disable=too-few-public-methods
+class PluginShare:
+    """Bookkeeping for a plugin object which is shared between instances."""
+
+    def __init__(self, owner: PluginInstance):
+        """Initialize the share.
+
+        Parameters:
+        -----------
+        owner (PluginInstance) : the instance that the plugin was created for,
+            which always keeps the plugin object.
+        """
+        self.owner = owner
+
+        self.sharers: "weakref.WeakSet[PluginInstance]" = weakref.WeakSet()
+        """ copies which still share the plugin.  Copies which are thrown
+        away drop out on their own. """
+
+        self.lock = threading.Lock()
@@ -0,0 +1,148 @@
+"""
+
+Lazy layered view of source data.
+
+Merging every source for a label up front costs time proportional to all of
+the data, even if only a few keys are ever read.  A LayeredDict keeps the
+source layers as they are, like a deep ChainMap, and only merges the parts
+that are read.  It gives the same results as tree_merge() of the layers.
+
+"""
+import logging
+from typing import Any, Dict, Iterator, List
+
+from collections.abc import Mapping
+
+from .shared import tree_merge, tree_freeze, tree_descend, KeyPath, MISSING
+
+logger = logging.getLogger("configerus.layered")
+
+
+class LayeredDict(Mapping):
+    """Read-only deep merge of dict layers, merged only where it is read.
+
+    Values follow tree_merge(): the highest priority layer with a key wins,
+    unless its value is a dict, in which case the dict values for that key
+    from all of the layers are merged (and any lower non-dict values are
+    ignored.)
+
+    Child values are kept once they are read, so each part of the tree is
+    merged at most once.
+    """
+
+    def __init__(self, layers: List[Dict[str, Any]], freeze: bool = False):
+        """Initialize the view.
+
+        Parameters:
+        -----------
+        layers (List[Dict]) : dict layers, in descending priority order.  The
+            layers are never changed.
+
+        freeze (bool) : hand out frozen values (@see tree_freeze())
+        """
+        self.layers = layers
+        self.freeze = freeze
+
+        self.children: Dict[Any, Any] = {}
+        """ child values that have been read, LayeredDicts for dicts which
+        more than one layer has """
+
+        self.materialized: Any = None
+        """ the whole merged tree, once it has been needed """
+
+    def __getitem__(self, key: Any) -> Any:
+        """Get a child, merging it if needed."""
+        value = self.child(key)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate keys in tree_merge() order (lowest layer first)."""
+        seen = set()
+        for layer in reversed(self.layers):
+            for key in layer:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self) -> int:
+        """Count the keys in all of the layers."""
+        return len(set().union(*self.layers))
+
+    def child(self, key: Any) -> Any:
+        """Get a child value, or MISSING.
+
+        Returns:
+        --------
+        The child value, which is a LayeredDict where more than one layer has a
+        dict for the key.
+        """
+        try:
+            return self.children[key]
+        except KeyError:
+            pass
+
+        values = [layer[key] for layer in self.layers if key in layer]
+        if not values:
+            return MISSING
+
+        if isinstance(values[0], dict):
+            dicts = [value for value in values if isinstance(value, dict)]
+            if len(dicts) > 1:
+                value = LayeredDict(dicts, self.freeze)
+            else:
+                value = dicts[0]
+        else:
+            value = values[0]
+
+        if self.freeze and not isinstance(value, LayeredDict):
+            value = tree_freeze(value)
+        self.children[key] = value
+        return value
+
+    def find(self, path: KeyPath, keys: Any = None) -> Any:
+        """Find the merged value at a path, or MISSING.
+
+        Only the layered dicts along the path are looked at, and only the
+        found value is merged.
+
+        Parameters:
+        -----------
+        path (KeyPath) : path down the tree
+
+        keys (Any) : the full key, used for error messages
+
+        Returns:
+        --------
+        The merged value, or MISSING if tree_descend() would give MISSING for
+        the merged tree.
+        """
+        node: Any = self
+        for depth, step in enumerate(path):
+            if not isinstance(node, LayeredDict):
+                node = tree_descend(node, path[depth:], keys)
+                break
+            node = node.child(step)
+            if node is MISSING:
+                return MISSING
+
+        if isinstance(node, LayeredDict):
+            return node.materialize()
+        return node
+
+    def materialize(self) -> Any:
+        """Merge the whole tree, once.
+
+        Returns:
+        --------
+        The tree_merge() of all of the layers (frozen if freeze is set)
+        """
+        if self.materialized is None:
+            merged: Dict[str, Any] = {}
+            for layer in self.layers:
+                merged = tree_merge(merged, layer)
+            if self.freeze:
+                merged = tree_freeze(merged)
+            self.materialized = merged
+        return self.materialized
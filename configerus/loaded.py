@@ -7,14 +7,25 @@ combined from any sources. This keeps this functionality for advanced
 interactions with that data.
 """
 import logging
-from typing import Any
-from .shared import tree_get
+import asyncio
+import functools
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from .shared import tree_get, tree_find, tree_descend, key_path, KeyPath
+from .shared import MISSING, FrozenDict, FrozenList
+from .format import template_free_nodes
+from .index import tree_index, tree_trie, index_covers, KeyTrie
+from .layered import LayeredDict
 
 logger = logging.getLogger("configerus:loaded")
 
 LOADED_KEY_ROOT = ""
 """ If this key is requested in .get() then the root data dict is returned """
 
+LOADED_RESOLVE_LAZY = "lazy"
+""" Format templates in values when they are retrieved with .get() """
+LOADED_RESOLVE_EAGER = "eager"
+""" Format all templates once, when the config is loaded """
+
 
 class Loaded:
     """A loaded config which contains all source config for a single label.
@@ -28,7 +39,13 @@ class Loaded:
 
     """
 
-    def __init__(self, data, parent, instance_id: str):
+    def __init__(
+        self,
+        data,
+        parent,
+        instance_id: str,
+        template_free: Optional[Dict[int, Any]] = None,
+    ):
         """Initialize Loaded object with data and a parent ref.
 
         parameters
@@ -36,19 +53,98 @@ class Loaded:
         data (Dict[str, Any]): deep dict struct that contains all of the merged
            configuration that is te be used for config retrieval. It is often
            a nested Dict with standard primitives as can be loaded from
-           json/yml
+           json/yml.  It can also be a LayeredDict of the source layers, which
+           is only merged where it is read.
 
         parent (Config): The parent Config object which created this object
            which is used for backreferencing, primarily when trying to perform
            template string substitution as substitution can refer to config
            from other sources.
+
+        template_free (Dict[int, Any]): template-free flags already found for
+           the same frozen data (such as by the Loaded that this copies), so
+           that they don't have to be found again.
         """
         assert data is not None, "None data was passed in"
 
-        self.data = data
+        self.layered: Optional[LayeredDict] = None
+        """ lazily merged source layers, if the data hasn't been merged """
+        self._data: Any = None
+
+        self.template_free: Dict[int, Any] = {}
+        """ lists and dicts in data which hold no templates, found when the
+        data is set, so that formatting can hand them back without walking
+        them (@see configerus.format.template_free_nodes()) """
+
+        self._set_data(data, template_free)
         self.parent = parent
         self.instance_id = instance_id
 
+        self.resolved: bool = False
+        """ True if all templates in data have already been formatted """
+
+        self.formatted: Dict[Tuple[str, ...], Tuple[Any, FrozenSet]] = {}
+        """ formatted values kept by get(), keyed by the reduced key path
+
+        Each value is kept with the (kind, name) dependencies that were read
+        to format it. """
+
+        self.dependents: Dict[Tuple[str, str], Set[Tuple[str, ...]]] = {}
+        """ reverse index of dependencies to the formatted keys using them """
+
+        self.formatted_generation: int = 0
+        """ bumped when formatted values are forgotten, so that a get() which
+        was formatting at the same time doesn't keep a stale value """
+
+        self.index: Optional[Dict[Tuple[Any, ...], Any]] = None
+        """ flat index of all paths in data, built on first use if the parent
+        config has index_loaded set (@see configerus.index) """
+
+        self.trie: Optional[KeyTrie] = None
+        """ key trie of data, built on first use by keys(), items() and
+        has_prefix() """
+
+    @property
+    def data(self) -> Any:
+        """Get all of the merged data, merging the layers if needed."""
+        if self._data is None:
+            self._data = self.layered.materialize()
+            self.template_free = self._template_free(self._data)
+        return self._data
+
+    @data.setter
+    def data(self, data: Any):
+        """Set the data, which may be a LayeredDict."""
+        self._set_data(data)
+
+    def _set_data(
+        self, data: Any, template_free: Optional[Dict[int, Any]] = None
+    ):
+        """Set the data, reusing template-free flags if they are given."""
+        if isinstance(data, LayeredDict):
+            self.layered = data
+            self._data = None
+            self.template_free = {}
+        else:
+            self.layered = None
+            self._data = data
+            if template_free is None or not isinstance(
+                data, (FrozenDict, FrozenList)
+            ):
+                template_free = self._template_free(data)
+            self.template_free = template_free
+
+    @staticmethod
+    def _template_free(data: Any) -> Dict[int, Any]:
+        """Flag the template-free nodes of data, if it is frozen.
+
+        The flags are kept by object identity, which only stays true while the
+        data can't be changed in place, so unfrozen data is never flagged.
+        """
+        if isinstance(data, (FrozenDict, FrozenList)):
+            return template_free_nodes(data)
+        return {}
+
     def _reload(self, data):
         """Force new data to be used.
 
@@ -60,6 +156,58 @@ class Loaded:
         @TODO signal on this?
         """
         self.data = data
+        self.resolved = False
+        self.index = None
+        self.trie = None
+        self.forget_formatted()
+
+    def forget_formatted(self, dependency: Tuple[str, str] = None):
+        """Forget formatted values kept by get().
+
+        Parameters:
+        -----------
+        dependency (Tuple[str, str]) : (kind, name) dependency.  Only values
+            which depend on it are forgotten.  If None then all formatted
+            values are forgotten.
+        """
+        self.formatted_generation += 1
+        if dependency is None:
+            self.formatted = {}
+            self.dependents = {}
+            return
+
+        for memo_key in self.dependents.pop(dependency, set()):
+            self.formatted.pop(memo_key, None)
+
+    def _remember_formatted(
+        self,
+        memo_key: Tuple[str, ...],
+        value: Any,
+        dependencies: Set[Tuple[str, str]],
+        generation: int,
+    ):
+        """Keep a formatted value, unless something was forgotten since."""
+        if not generation == self.formatted_generation:
+            return
+        self.formatted[memo_key] = (value, frozenset(dependencies))
+        for dependency in dependencies:
+            self.dependents.setdefault(dependency, set()).add(memo_key)
+
+    def resolve(self):
+        """Format all of the data once and keep the results.
+
+        After this, get() doesn't need to do any formatting, and data (and
+        get(format=False)) gives the formatted values.
+
+        Raises:
+        -------
+        Any formatting exceptions, such as KeyError for missing template
+        targets.
+        """
+        self.data = self.format(self.data)
+        self.resolved = True
+        self.index = None
+        self.trie = None
 
     def has(self, key: Any = LOADED_KEY_ROOT):
         """Check if a key value exists in the config.
@@ -104,15 +252,86 @@ class Loaded:
             This allows you to pass around keys and append to them on the fly
             without having to be overly concerned about clean formatting.
 
+            Keys are reduced to a KeyPath on each call (str keys are cached.)
+            Pass a configerus.shared.KeyPath to skip that entirely.
+
         Returns:
         --------
         Boolean : if a value exists in loaded config
         """
-        try:
-            tree_get(self.data, key, ignore=["", LOADED_KEY_ROOT])
-            return True
-        except KeyError:
-            return False
+        path = key_path(key, ignore=["", LOADED_KEY_ROOT])
+        return self._find(path) is not MISSING
+
+    def has_prefix(self, prefix: Any = LOADED_KEY_ROOT) -> bool:
+        """Check if there are any keys at or under a key prefix.
+
+        Parameters:
+        -----------
+        prefix (Any) : key prefix in any form that get() accepts
+
+        Returns:
+        --------
+        Boolean : if any keys() would be found for the prefix
+        """
+        return self._trie_node(prefix) is not None
+
+    def keys(self, prefix: Any = LOADED_KEY_ROOT) -> List[str]:
+        """List all of the keys at or under a key prefix.
+
+        Only the matching branch of the key trie is visited, and nothing is
+        formatted.
+
+        Parameters:
+        -----------
+        prefix (Any) : key prefix in any form that get() accepts
+
+        Returns:
+        --------
+        List[str] of the dot notation keys of all of the values (not the
+        dicts and lists containing them) under the prefix, in data order.  It
+        is empty if there is nothing under the prefix.
+        """
+        return [key for key, _ in self._trie_items(prefix)]
+
+    # pylint: disable=redefined-builtin
+    def items(
+        self, prefix: Any = LOADED_KEY_ROOT, format: bool = False
+    ) -> List[Tuple[str, Any]]:
+        """List all of the key values at or under a key prefix.
+
+        Parameters:
+        -----------
+        prefix (Any) : key prefix in any form that get() accepts
+
+        format (bool) : format the listed values, in a single pass.  Nothing
+            outside of the prefix is formatted.
+
+        Returns:
+        --------
+        List of (key, value) as for keys()
+        """
+        items = self._trie_items(prefix)
+        if format and items and not self.resolved:
+            values = self.format([value for _, value in items])
+            items = [(key, value) for (key, _), value in zip(items, values)]
+        return items
+
+    def _trie_node(self, prefix: Any) -> Optional[KeyTrie]:
+        """Find the key trie node for a prefix, building the trie if needed."""
+        if self.trie is None:
+            self.trie = tree_trie(self.data)
+        return self.trie.find(key_path(prefix, ignore=["", LOADED_KEY_ROOT]))
+
+    def _trie_items(self, prefix: Any) -> List[Tuple[str, Any]]:
+        """List the dot notation keys and values under a prefix."""
+        path = key_path(prefix, ignore=["", LOADED_KEY_ROOT])
+        node = self._trie_node(path)
+        if node is None:
+            return []
+        return [
+            (".".join(str(step) for step in leaf_path), value)
+            for leaf_path, value in node.leaves(tuple(path))
+        ]
 
     # Using the "format" keyword is much easier to consume.
     # pylint: disable=redefined-builtin
@@ -165,6 +384,9 @@ class Loaded:
             this allows you to pass around keys and append to them on the fly
             without having to be overly concerned about clean formatting.
 
+            Keys are reduced to a KeyPath on each call (str keys are cached.)
+            Pass a configerus.shared.KeyPath to skip that entirely.
+
         format (bool): should retrieved string values be checked for variable
            substitution?  If so then the str value is checked using regex for
            things that should be replaced with other config values.
@@ -186,6 +408,11 @@ class Loaded:
             Dict with child elements, an array or any other primitive.
             If the return is a string then it is formatted for variable
             substitution (see self.format_string().)
+            Formatting never changes the loaded data; formatted containers are
+            new objects, and unformatted subtrees are returned as they are.  If
+            the parent config is read-only then containers are frozen.
+            Formatted values are kept and handed out again by later calls
+            (@see Config.format_memo) so don't change them.
 
         Throws:
         -------
@@ -194,28 +421,265 @@ class Loaded:
         no default value was provided.
 
         """
-        value = ""
+        value = self.find(key, format=format)
 
-        try:
-            value = tree_get(self.data, key, ignore=["", LOADED_KEY_ROOT])
-
-        except KeyError as err:
+        if value is MISSING:
             if default is None:
-                # hand off the exception
-                raise err
+                # let tree_get() raise the KeyError
+                self._lookup(key_path(key, ignore=["", LOADED_KEY_ROOT]))
             # Use the default value
             logger.debug("Failed to find config key : %s", key)
             value = default
+            if format:
+                value = self.format(value)
+
+        if validator:
+            self.parent.validate(value, validator)
+
+        return value
 
-        if format and value is not None:
-            # try to format any values
+    # pylint: disable=redefined-builtin
+    def find(self, key: Any = LOADED_KEY_ROOT, format: bool = True):
+        """Find a key value, returning MISSING if it doesn't exist.
+
+        This is get() without a default or validation, for code which expects
+        misses, as a miss doesn't cost an exception.
+
+        Parameters:
+        -----------
+        key (Any) : @see get()
+
+        format (bool) : @see get()
+
+        Returns:
+        --------
+        The (formatted) value, or configerus.shared.MISSING if the key could
+        not be found.  Use `is MISSING` to check.
+        """
+        path = key_path(key, ignore=["", LOADED_KEY_ROOT])
+        # resolved data has already been formatted
+        format = format and not self.resolved
+
+        memo = format and self.parent.format_memo
+        if memo and path in self.formatted:
+            value, dependencies = self.formatted[path]
+            # whoever is formatting with this value depends on the same
+            self.parent.record_dependencies(dependencies)
+            return value
+
+        generation = self.formatted_generation
+        value = self._find(path)
+        if value is MISSING or value is None or not format:
+            return value
+
+        if not memo:
+            return self.format(value)
+
+        with self.parent.track_dependencies() as dependencies:
             value = self.format(value)
+        self._remember_formatted(path, value, dependencies, generation)
+        return value
+
+    # pylint: disable=redefined-builtin, too-many-locals, too-many-branches
+    def get_many(
+        self,
+        keys: Iterable[Any],
+        defaults: Any = None,
+        format: bool = True,
+        validator: str = "",
+        as_tuple: bool = False,
+    ):
+        """Get a number of key values from the loaded config at once.
+
+        This gives the same values as calling get() for each key, but keys are
+        grouped by their parent path, so that each parent is found once, and
+        all of the values are formatted in a single pass.  Reading many
+        sibling keys like `service.db.host`, `service.db.port` is cheap.
+
+        Parameters:
+        -----------
+        keys (Iterable[Any]) : keys to get, each in any form that get()
+            accepts.
+
+        defaults (Dict | List) : default values for keys which can't be found.
+            Either a dict using the same keys as the returned dict, or a list
+            with a default for each key in order.  Keys with no default (or a
+            None default) raise a KeyError if they can't be found.
+
+        format (bool) : should the values be formatted.  @see get()
+
+        validator (str) : validation target applied to each value.
+
+        as_tuple (bool) : return a tuple of the values in key order instead of
+            a dict.
+
+        Returns:
+        --------
+        Dict of key to value.  str, int and KeyPath keys are used as they are
+        passed in; unhashable keys (such as lists) are joined into dot
+        notation.  Or a tuple of values if as_tuple is set.
+
+        Raises:
+        -------
+        KeyError for the first key that can't be found and has no default.
+        """
+        keys = list(keys)
+        paths = [key_path(key, ignore=["", LOADED_KEY_ROOT]) for key in keys]
+        result_keys = [
+            key
+            if isinstance(key, (str, int, KeyPath))
+            else ".".join(str(step) for step in path)
+            for key, path in zip(keys, paths)
+        ]
+
+        if defaults is None:
+            key_defaults: List[Any] = [None] * len(keys)
+        elif isinstance(defaults, dict):
+            key_defaults = [defaults.get(key) for key in result_keys]
+        else:
+            key_defaults = list(defaults)
+            if not len(key_defaults) == len(keys):
+                raise ValueError(
+                    "get_many() needs one default for each key, got "
+                    f"{len(key_defaults)} defaults for {len(keys)} keys"
+                )
+
+        memo = format and not self.resolved and self.parent.format_memo
+        generation = self.formatted_generation
+        values: List[Any] = [None] * len(keys)
+        # positions of values that still need formatting, and which of them
+        # are found config (that can be kept) rather than defaults
+        unformatted: List[int] = []
+        found: Set[int] = set()
+
+        groups: Dict[KeyPath, List[int]] = {}
+        for position, path in enumerate(paths):
+            if memo and path in self.formatted:
+                values[position], dependencies = self.formatted[path]
+                self.parent.record_dependencies(dependencies)
+            else:
+                groups.setdefault(path[:-1], []).append(position)
+
+        for prefix, positions in groups.items():
+            # the root of layered data is only found by merging all of it,
+            # so top level keys are each found in the layers instead
+            by_key = (
+                not prefix
+                and self._data is None
+                and any(self.layered.layers)
+            )
+            parent = MISSING if by_key else self._find(prefix)
+
+            for position in positions:
+                path = paths[position]
+                if by_key:
+                    value = self._find(path)
+                else:
+                    value = parent
+                    if path and value is not MISSING:
+                        value = tree_descend(value, path[-1:], keys[position])
+
+                if value is not MISSING:
+                    values[position] = value
+                    if not self.resolved:
+                        found.add(position)
+                        unformatted.append(position)
+                    continue
+
+                if key_defaults[position] is None:
+                    # let tree_get() raise the KeyError
+                    self._lookup(path)
+                logger.debug("Failed to find config key : %s", keys[position])
+                values[position] = key_defaults[position]
+                unformatted.append(position)
+
+        unformatted = [
+            position
+            for position in unformatted
+            if values[position] is not None
+        ]
+        if format and unformatted:
+            # one pass means one set of dependencies, so each kept value
+            # depends on everything that the batch read
+            with self.parent.track_dependencies() as dependencies:
+                formatted = self.format(
+                    [values[position] for position in unformatted]
+                )
+            for position, value in zip(unformatted, formatted):
+                values[position] = value
+                if memo and position in found:
+                    self._remember_formatted(
+                        paths[position], value, dependencies, generation
+                    )
 
         if validator:
-            self.parent.validate(value, validator)
+            for value in values:
+                self.parent.validate(value, validator)
+
+        if as_tuple:
+            return tuple(values)
+        return dict(zip(result_keys, values))
 
+    def _find(self, path: KeyPath) -> Any:
+        """Find the node at a path, or MISSING.
+
+        Uses the flat index if it is enabled, and reads layered data without
+        merging it all.  A miss in the index is only checked in the tree for
+        paths that the index can't answer for (@see index_covers())
+        """
+        if self._data is None and path:
+            # an empty root raises from tree_find() below
+            if any(self.layered.layers):
+                return self.layered.find(path)
+        if self.parent.index_loaded and path:
+            if self.index is None:
+                self.index = tree_index(self.data)
+            value = self.index.get(path, MISSING)
+            if value is not MISSING or index_covers(path):
+                return value
+        return tree_find(self.data, path)
+
+    def _lookup(self, path: KeyPath) -> Any:
+        """Find the node at a path, raising a KeyError if it is missing."""
+        value = self._find(path)
+        if value is MISSING:
+            # let tree_get() raise the right exception
+            return tree_get(self.data, path)
         return value
 
+    # pylint: disable=redefined-builtin
+    async def aget(
+        self,
+        key: Any = LOADED_KEY_ROOT,
+        format: bool = True,
+        validator: str = "",
+        default: Any = None,
+    ):
+        """Get a key value from the loaded config without blocking.
+
+        This is the asyncio equivalent of get().  Formatting can load other
+        config labels and read files, and validation can be expensive, so the
+        get() is run in the default executor.
+
+        Parameters:
+        -----------
+        @see get()
+
+        Returns:
+        --------
+        @see get()
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                self.get,
+                key=key,
+                format=format,
+                validator=validator,
+                default=default,
+            ),
+        )
+
     def format(self, data):
         """Format some data using the config object formatters.
 
@@ -225,7 +689,9 @@ class Loaded:
             passed to the formatter plugins in descending priority order.
 
         """
-        return self.parent.format(data, self.instance_id)
+        return self.parent.format(
+            data, self.instance_id, template_free=self.template_free
+        )
 
     def validate(
         self, data, validate_target: Any, exception_if_invalid: bool = True
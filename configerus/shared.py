@@ -7,16 +7,167 @@ data using the dot notation syntax and the merging of those trees.
 
 """
 import logging
-from typing import Dict, Any, List
+import functools
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger("configerus.shared")
 
+KEY_PATH_CACHE_SIZE = 1024
+""" How many reduced str keys to keep for reuse (@see key_path()) """
+
+
+class Missing:
+    """Type of the MISSING sentinel."""
+
+    def __repr__(self):
+        """Show the sentinel name."""
+        return "MISSING"
+
+    def __bool__(self):
+        """Missing values are falsy."""
+        return False
+
+    def __reduce__(self):
+        """Unpickle as the single MISSING instance."""
+        return "MISSING"
+
+
+MISSING = Missing()
+""" Returned by the find functions when a key doesn't exist
+
+Misses are common (such as optional overrides with template defaults) so the
+find functions return this instead of raising a KeyError, which costs a lot
+more than a comparison.  Compare it using `is MISSING`. """
+
+
+class FrozenDict(dict):
+    """A dict which can't be changed after it has been created.
+
+    Used for read-only loaded config.  It is still a dict, so anything that
+    reads dicts (such as validators) keeps working.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        """Refuse to change the dict."""
+        raise TypeError("Config data is read-only and cannot be changed")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self):
+        """Frozen data can be shared instead of copied."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Frozen data can be shared instead of copied."""
+        return self
+
+    def __reduce__(self):
+        """Pickle as a FrozenDict built from a plain dict."""
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """A list which can't be changed after it has been created.
+
+    Used for read-only loaded config.  It is still a list, so anything that
+    reads lists (such as validators) keeps working.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        """Refuse to change the list."""
+        raise TypeError("Config data is read-only and cannot be changed")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __iadd__ = _readonly
+    __imul__ = _readonly
+    append = _readonly
+    clear = _readonly
+    extend = _readonly
+    insert = _readonly
+    pop = _readonly
+    remove = _readonly
+    reverse = _readonly
+    sort = _readonly
+
+    def __copy__(self):
+        """Frozen data can be shared instead of copied."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Frozen data can be shared instead of copied."""
+        return self
+
+    def __reduce__(self):
+        """Pickle as a FrozenList built from a plain list."""
+        return (FrozenList, (list(self),))
+
+
+def tree_freeze(tree: Any) -> Any:
+    """Convert a tree of dicts and lists into FrozenDicts and FrozenLists.
+
+    Parameters:
+    -----------
+    tree (Any) : data tree, such as loaded config
+
+    Uses an explicit stack rather than recursion, so deep trees don't hit the
+    recursion limit.
+
+    Returns:
+    --------
+    A read-only version of the tree.  Subtrees which are already frozen are
+    kept as they are.
+    """
+    if not _tree_unfrozen(tree):
+        return tree
+
+    # each frame is (container, its values, frozen values so far)
+    stack = [(tree, iter(_tree_values(tree)), [])]
+    while True:
+        node, values, frozen = stack[-1]
+        for value in values:
+            if _tree_unfrozen(value):
+                stack.append((value, iter(_tree_values(value)), []))
+                break
+            frozen.append(value)
+        else:
+            stack.pop()
+            if isinstance(node, dict):
+                node = FrozenDict(zip(node.keys(), frozen))
+            else:
+                node = FrozenList(frozen)
+            if not stack:
+                return node
+            stack[-1][2].append(node)
+
+
+def _tree_unfrozen(node: Any) -> bool:
+    """Check if a node is a dict or list which isn't frozen yet."""
+    return isinstance(node, (dict, list)) and not isinstance(
+        node, (FrozenDict, FrozenList)
+    )
+
+
+def _tree_values(node: Any):
+    """Get the values of a dict or list."""
+    if isinstance(node, dict):
+        return node.values()
+    return node
+
+
 # @see https://stackoverflow.com/
 #       @questions/20656135/python-deep-merge-dictionary-data
 
 
 def tree_merge(source: Any, destination: Any):
-    """Deep merge source into destination.
+    """Deep merge source over destination, without changing either.
 
     >>> a = { 'first' : { 'all_rows' : { 'pass' : 'dog', 'number' : '1' } } }
     >>> b = { 'first' : { 'all_rows' : { 'fail' : 'cat', 'number' : '5' } } }
@@ -24,62 +175,246 @@ def tree_merge(source: Any, destination: Any):
          { 'first' : { 'all_rows' :
            { 'pass' : 'dog', 'fail' : 'cat', 'number' : '5' } } }
     True
+
+    Source values win, except where both sides have a dict, in which case the
+    dicts are merged.  The merged tree shares structure with the inputs: new
+    dicts are only made where both sides have a dict, and every other subtree
+    is the same object as in the source or destination.  So the cost is
+    proportional to the overlap, not to the size of the trees, but changing
+    the merged tree can change the inputs.
+
+    Uses an explicit stack rather than recursion, so deep trees don't hit the
+    recursion limit.
+
+    Returns:
+    --------
+    The merged tree
     """
     if not (isinstance(source, dict) and isinstance(destination, dict)):
         return source
 
-    for key, value in source.items():
-        if isinstance(value, dict) and key in destination:
-            value = tree_merge(value, destination[key])
-        destination[key] = value
+    merged = dict(destination)
+    stack = [(source, destination, merged)]
+    while stack:
+        source_node, destination_node, merged_node = stack.pop()
+        for key, value in source_node.items():
+            destination_value = destination_node.get(key)
+            if isinstance(value, dict) and isinstance(destination_value, dict):
+                merged_value = dict(destination_value)
+                merged_node[key] = merged_value
+                stack.append((value, destination_value, merged_value))
+            else:
+                merged_node[key] = value
+
+    return merged
+
+
+class KeyPath(tuple):
+    """A key, reduced once to the flat steps of a path down a tree.
+
+    Keys can be passed around in many forms (@see tree_reduce()) which all
+    have to be reduced before they can be used.  A KeyPath is the reduced
+    form, with the steps which could be list indexes already converted, so
+    build one for keys that are used over and over and pass it instead of the
+    key:
+
+        path = KeyPath("servers.0.host")
+        loaded.get(path)
+
+    It is a tuple of the steps, so it can also be used as a dict key.
+    """
+
+    def __new__(cls, key: Any = (), glue: str = ".", ignore: List[Any] = None):
+        """Reduce the key to a path.
+
+        Parameters:
+        -----------
+        key (Any) : any key that tree_reduce() accepts, or a KeyPath
+
+        glue (str) : step separator for str keys
+
+        ignore (List[Any]) : steps which should be dropped
+        """
+        path = super().__new__(cls, tree_reduce(key, glue, ignore))
+        path.indexes = tuple(
+            int(step)
+            if isinstance(step, str) and step.isdecimal()
+            else (step if isinstance(step, int) else None)
+            for step in path
+        )
+        """ each step as a list index, or None if it can't be one """
+        return path
+
+    def __getitem__(self, item):
+        """Slices of a KeyPath are KeyPaths, without reducing again."""
+        if isinstance(item, slice):
+            path = tuple.__new__(KeyPath, tuple.__getitem__(self, item))
+            path.indexes = self.indexes[item]
+            return path
+        return tuple.__getitem__(self, item)
+
+    def __getnewargs__(self):
+        """Unpickle from the already reduced steps."""
+        return (tuple(self), "")
 
-    return destination
+    def __repr__(self):
+        """Show the path in dot notation."""
+        return "KeyPath({})".format(".".join(str(step) for step in self))
+
+
+@functools.lru_cache(maxsize=KEY_PATH_CACHE_SIZE)
+def _cached_key_path(key: Any, glue: str, ignore: Tuple[Any, ...]) -> KeyPath:
+    """Reduce a hashable key, keeping the result for reuse."""
+    return KeyPath(key, glue, list(ignore))
+
+
+def key_path(
+    key: Any, glue: str = ".", ignore: Optional[List[Any]] = None
+) -> KeyPath:
+    """Get the KeyPath for a key.
+
+    KeyPaths are passed through, and str and int keys are reduced through a
+    bounded cache, as most code uses a small set of constant keys.  Other keys
+    (such as lists) are reduced every time.
+
+    Parameters:
+    -----------
+    @see KeyPath
+
+    Returns:
+    --------
+    KeyPath for the key
+    """
+    if isinstance(key, KeyPath):
+        return key
+    if isinstance(key, (str, int)):
+        return _cached_key_path(key, glue, tuple(ignore or ()))
+    return KeyPath(key, glue, ignore)
 
 
 def tree_get(
-    node: Dict, keys: List[str], glue: str = ".", ignore: List[str] = None
+    node: Dict, keys: Any, glue: str = ".", ignore: List[str] = None
 ) -> Any:
-    """Find a path down a tree using the keys as a step by step path."""
+    """Find a path down a tree using the keys as a step by step path.
+
+    keys can be anything that tree_reduce() accepts, or a KeyPath.
+    """
     if not node:
         raise ValueError(
             "There was no data in the config so no key match could be made"
         )
 
-    flat_steps = tree_reduce(tree=keys, glue=glue, ignore=ignore)
+    flat_steps = key_path(keys, glue=glue, ignore=ignore)
     if len(flat_steps) == 0:
         return node
 
-    for step in flat_steps:
-        try:
-            if node is None:
-                raise KeyError("Path tried to descend into None")
-            if isinstance(node, str):
-                raise KeyError(
-                    "Path tried to descend into a string: {}".format(node)
-                )
-            if isinstance(node, list) and step.isnumeric():
-                node = node[int(step)]
-            else:
-                # hopefully the target is subscriptable?
-                node = node[step]
+    for step, index in zip(flat_steps, flat_steps.indexes):
+        node = tree_step(node, step, index, keys)
+
+    return node
+
+
+def tree_find(
+    node: Dict, keys: Any, glue: str = ".", ignore: List[str] = None
+) -> Any:
+    """Find a path down a tree, without raising for missing keys.
+
+    This is tree_get() for code that expects misses.
+
+    Returns:
+    --------
+    The node at the path, or MISSING if tree_get() would raise a KeyError.
+    Other tree_get() errors (no data, bad list indexes) are still raised.
+    """
+    if not node:
+        # raise the same error as tree_get()
+        return tree_get(node, keys, glue, ignore)
+
+    return tree_descend(node, key_path(keys, glue=glue, ignore=ignore), keys)
 
-        except KeyError as err:
-            raise KeyError(
-                f"Key {keys} not found in loaded config data. '{step}' "
-                "was not found"
-            ) from err
-        except IndexError as err:
-            raise IndexError(
-                f"Array index '{step}' was not found in list : {node}"
-            ) from err
-        except TypeError as err:
-            raise ValueError(
-                f"Invalid key '{step}' in the keys list: '{node}'"
-            ) from err
+
+def tree_descend(node: Any, path: KeyPath, keys: Any = None) -> Any:
+    """Step down a path from any node, returning MISSING for missing keys.
+
+    Unlike tree_find(), an empty node is just a node without the path.
+
+    Parameters:
+    -----------
+    node (Any) : tree node to start from
+
+    path (KeyPath) : steps down from the node
+
+    keys (Any) : the full key, used for error messages
+
+    Returns:
+    --------
+    The node at the path, or MISSING
+    """
+    for step, index in zip(path, path.indexes):
+        if isinstance(node, dict):
+            node = node.get(step, MISSING)
+            if node is MISSING:
+                return MISSING
+        elif node is None or isinstance(node, str):
+            return MISSING
+        else:
+            try:
+                node = tree_step(node, step, index, keys)
+            except KeyError:
+                return MISSING
 
     return node
 
 
+def tree_step(node: Any, step: Any, index: Any = None, keys: Any = None):
+    """Take a single step down a tree.
+
+    Parameters:
+    -----------
+    node (Any) : tree node to step into
+
+    step (Any) : key step (@see KeyPath)
+
+    index (Optional[int]) : the step as a list index, if it can be one
+
+    keys (Any) : the full key, used for error messages
+
+    Returns:
+    --------
+    The child node
+
+    Raises:
+    -------
+    KeyError if the step doesn't exist, IndexError if the list index doesn't
+    exist and ValueError if the node can't be stepped into with the step.
+    """
+    try:
+        if node is None:
+            raise KeyError("Path tried to descend into None")
+        if isinstance(node, str):
+            raise KeyError(
+                "Path tried to descend into a string: {}".format(node)
+            )
+        if isinstance(node, list) and index is not None:
+            return node[index]
+        # hopefully the target is subscriptable?
+        return node[step]
+
+    except KeyError as err:
+        raise KeyError(
+            f"Key {keys if keys is not None else step} not found in loaded "
+            f"config data. '{step}' was not found"
+        ) from err
+    except IndexError as err:
+        raise IndexError(
+            f"Array index '{step}' was not found in list : {node}"
+        ) from err
+    except TypeError as err:
+        raise ValueError(
+            f"Invalid key '{step}' in the keys list: '{node}'"
+        ) from err
+
+
 def tree_reduce(
     tree: Any, glue: str = ".", ignore: List[Any] = None
 ) -> List[str]:
@@ -105,22 +440,24 @@ def tree_reduce(
     --------
     List[str] tree reduced to a flat (single) depth, potentially empty
     """
-    # don't use the iterator solution with strings
-    if isinstance(tree, str):
-        if glue == "":
-            tree = [tree]
-        else:
-            tree = tree.split(glue)
-    elif isinstance(tree, int):
-        tree = [tree]
-
-    else:
-        flatter = []
-        for node in tree:
-            flat_node = tree_reduce(node, glue, ignore)
-            flatter += flat_node
-        tree = flatter
-
     if ignore is None:
         ignore = []
-    return [node for node in tree if node and node not in ignore]
+
+    flat: List[Any] = []
+    # explicit stack of iterators, rather than recursion
+    stack = [iter([tree])]
+    while stack:
+        try:
+            node = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+
+        if isinstance(node, str):
+            flat += [node] if glue == "" else node.split(glue)
+        elif isinstance(node, int):
+            flat.append(node)
+        else:
+            stack.append(iter(node))
+
+    return [node for node in flat if node and node not in ignore]
@@ -125,3 +125,88 @@ class BasicConstruct(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             shared.tree_get(tree, "1.2.string")
+
+    def test_key_path(self):
+        """key paths are reduced once and can be passed to tree_get"""
+        tree = {"1": {"2": ["1.2 0", "1.2 1"]}}
+
+        path = shared.KeyPath(["1", "2.1", ""])
+        self.assertEqual(path, ("1", "2", "1"))
+        self.assertEqual(path.indexes, (1, 2, 1))
+        self.assertEqual(shared.tree_get(tree, path), "1.2 1")
+        self.assertEqual(shared.KeyPath("a.0").indexes, (None, 0))
+        # numeric characters that aren't digits are only dict keys
+        self.assertEqual(shared.KeyPath("½.²").indexes, (None, None))
+        self.assertEqual(shared.tree_get({"½": {"²": "half"}}, "½.²"), "half")
+
+        # str keys are reduced through the cache, KeyPaths pass through
+        self.assertIs(shared.key_path("1.2.0"), shared.key_path("1.2.0"))
+        self.assertIs(shared.key_path(path), path)
+        self.assertEqual(shared.key_path(["1", "2.0"]), ("1", "2", "0"))
+        self.assertEqual(
+            shared.key_path(".1..", ignore=["", "1"]), shared.KeyPath()
+        )
+
+    def test_deep_trees(self):
+        """trees deeper than the recursion limit can be merged and reduced"""
+        depth = 5000
+        source = leaf = {}
+        destination = {}
+        destination_leaf = destination
+        for _ in range(depth):
+            leaf["n"] = {}
+            leaf = leaf["n"]
+            destination_leaf["n"] = {"other": "destination"}
+            destination_leaf = destination_leaf["n"]
+        leaf["value"] = "source"
+
+        merged = shared.tree_merge(source, destination)
+        path = ["n"] * depth
+        self.assertEqual(shared.tree_get(merged, path + ["value"]), "source")
+        self.assertEqual(
+            shared.tree_get(merged, path[:-1] + ["other"]), "destination"
+        )
+
+        key = "last"
+        for _ in range(depth):
+            key = ["n", key]
+        self.assertEqual(shared.tree_reduce(key), path + ["last"])
+
+    def test_tree_find(self):
+        """tree_find() returns MISSING where tree_get() raises a KeyError"""
+        tree = {"1": {"2": ["1.2 0"], "3": None, "4": "string"}}
+
+        self.assertEqual(shared.tree_find(tree, "1.2.0"), "1.2 0")
+        self.assertIs(shared.tree_find(tree, "1.5"), shared.MISSING)
+        self.assertIs(shared.tree_find(tree, "1.3.1"), shared.MISSING)
+        self.assertIs(shared.tree_find(tree, "1.4.1"), shared.MISSING)
+        self.assertFalse(shared.MISSING)
+
+        with self.assertRaises(IndexError):
+            shared.tree_find(tree, "1.2.5")
+        with self.assertRaises(ValueError):
+            shared.tree_find({}, "1")
+
+    def test_tree_merge_shared(self):
+        """tree_merge() doesn't change its inputs and shares what it can"""
+        source = {"1": {"1": "source 1.1"}, "2": {"1": "source 2.1"}}
+        destination = {"1": {"2": "destination 1.2"}, "3": {"1": "dest 3.1"}}
+
+        merged = shared.tree_merge(source, destination)
+
+        self.assertEqual(
+            merged,
+            {
+                "1": {"2": "destination 1.2", "1": "source 1.1"},
+                "3": {"1": "dest 3.1"},
+                "2": {"1": "source 2.1"},
+            },
+        )
+        self.assertEqual(
+            source, {"1": {"1": "source 1.1"}, "2": {"1": "source 2.1"}}
+        )
+        self.assertEqual(destination["1"], {"2": "destination 1.2"})
+        # only the overlapping dicts are new
+        self.assertIs(merged["2"], source["2"])
+        self.assertIs(merged["3"], destination["3"])
+        self.assertIsNot(merged["1"], destination["1"])
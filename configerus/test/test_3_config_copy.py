@@ -66,3 +66,60 @@ class ConfigBehaviour(unittest.TestCase):
         self.assertEqual(config1_copy.get("two"), "copy1 2")
         self.assertEqual(config2_copy.get("one"), "copy2 1")
         self.assertEqual(config2_copy.get("two"), "copy2 2")
+
+    def test_copy_on_write(self):
+        """Test that copies share plugins and loaded config until changed"""
+        config = configerus.new_config()
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "orig", 80).set_data(
+            {"copy": {"one": "orig 1"}}
+        )
+        loaded = config.load("copy")
+
+        copy1 = config.copy()
+        # loaded config is shared, so nothing needs to load or be copied
+        self.assertIs(copy1.load("copy").data, loaded.data)
+        self.assertEqual(copy1.load("copy").get("one"), "orig 1")
+
+        copy1.add_source(PLUGIN_ID_SOURCE_DICT, "copy1", 81).set_data(
+            {"copy": {"two": "copy1 2"}}
+        )
+        # only the new source loads, the orig source layer is reused
+        orig_instance = copy1.plugins.get_instance(instance_id="orig")
+        self.assertIsNotNone(orig_instance._share)
+        self.assertEqual(copy1.load("copy").get("two"), "copy1 2")
+        self.assertEqual(copy1.load("copy").get("one"), "orig 1")
+        self.assertIsNotNone(orig_instance._share)
+
+        # changing the original plugin copies it, and leaves the copy alone
+        config.plugins.get_plugin(instance_id="orig").set_data(
+            {"copy": {"one": "changed 1"}}
+        )
+        config.reload_source("orig")
+        self.assertEqual(config.load("copy").get("one"), "changed 1")
+        copy1.reload_source("orig")
+        self.assertEqual(copy1.load("copy").get("one"), "orig 1")
+        self.assertIs(orig_instance.plugin.config, copy1)
+
+    def test_copy_keeps_source_handle(self):
+        """the add_source() handle keeps working after a copy"""
+        config = configerus.new_config()
+        source = config.add_source(PLUGIN_ID_SOURCE_DICT, "orig", 80)
+        source.set_data({"copy": {"one": "orig 1"}})
+        self.assertEqual(config.load("copy").get("one"), "orig 1")
+
+        config_copy = config.copy()
+        config_copy.reload_source("orig")
+        self.assertEqual(config_copy.load("copy").get("one"), "orig 1")
+
+        source.set_data({"copy": {"one": "changed 1"}})
+        config.reload_source("orig")
+        self.assertIs(config.plugins.get_plugin(instance_id="orig"), source)
+        self.assertEqual(config.load("copy").get("one"), "changed 1")
+
+        # the copy made its own plugin when it used it
+        config_copy.reload_source("orig")
+        self.assertEqual(config_copy.load("copy").get("one"), "orig 1")
+
+        # a copy which is thrown away doesn't affect the original
+        config.copy()
+        self.assertIs(config.plugins.get_plugin(instance_id="orig"), source)
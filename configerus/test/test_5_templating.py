@@ -16,6 +16,7 @@ from configerus.config import CONFIG_PATH_LABEL
 from configerus.loaded import LOADED_KEY_ROOT
 from configerus.contrib.dict import PLUGIN_ID_SOURCE_DICT
 from configerus.contrib.files import PLUGIN_ID_SOURCE_PATH
+from configerus.format import compile_template
 
 from configerus.test import make_test_config, test_config_cleanup
 
@@ -352,6 +353,31 @@ class ConfigTemplating(unittest.TestCase):
             "AdefaultZ",
         )
 
+    def test_compiled_templates(self):
+        """templates are compiled once, and each tag stands alone"""
+        compile_template.cache_clear()
+        for _ in range(3):
+            self.assertEqual(
+                self.loaded_config.format("{{fail?default}}-{{40}}"),
+                "default-{}".format(self.loaded_config.get("40")),
+            )
+        self.assertEqual(compile_template.cache_info().misses, 1)
+        self.assertEqual(compile_template.cache_info().hits, 2)
+
+        # template markers outside of closed tags are text
+        self.assertEqual(
+            self.loaded_config.format("a::{{40}}?"),
+            "a::{}?".format(self.loaded_config.get("40")),
+        )
+        self.assertEqual(self.loaded_config.format("A{{40"), "A{{40")
+        with self.assertRaises(ValueError):
+            self.loaded_config.format("A}}{{40}}")
+
+        # text is never mistaken for tokens
+        self.assertEqual(
+            self.loaded_config.format("@@@{{value::a@@@b}}@@@"), "@@@a@@@b@@@"
+        )
+
     def test_special_formats(self):
         """test some of the special format options"""
 
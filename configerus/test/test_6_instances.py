@@ -272,3 +272,42 @@ class ConfigTemplating(unittest.TestCase):
         self.assertEqual(instance_list[0].priority, 90)
         self.assertEqual(instance_list[1].priority, 70)
         self.assertEqual(instance_list[len(starting_range)].priority, 30)
+
+    def test_formatter_dispatch(self):
+        """formatters map plugin names once, until formatters are added"""
+        config = Config()
+        config.add_formatter("dummy_1", "low", priority=40)
+        config.add_formatter("dummy_1", "high", priority=70)
+
+        config.format("no templates", "label")
+        formatter = config.formatter
+        self.assertEqual(
+            formatter.format_plugin("dummy_1").instance_id, "high"
+        )
+        self.assertEqual(formatter.format_plugin("low").instance_id, "low")
+        with self.assertRaises(RuntimeError):
+            formatter.format_plugin("dummy_2")
+
+        config.format("no templates", "label")
+        self.assertIs(config.formatter, formatter)
+
+        config.add_formatter("dummy_2", "dummy_1", priority=10)
+        config.format("no templates", "label")
+        self.assertIsNot(config.formatter, formatter)
+        # instance_id matches come before plugin_id matches
+        self.assertEqual(
+            config.formatter.format_plugin("dummy_1").instance_id, "dummy_1"
+        )
+
+        # plugins changed through the plugin list are picked up too
+        formatter = config.formatter
+        config.plugins.add_plugin(Type.FORMATTER, "dummy_2", "direct", 90)
+        config.format("no templates", "label")
+        self.assertIs(config.formatter, formatter)
+        self.assertEqual(
+            formatter.format_plugin("direct").instance_id, "direct"
+        )
+        config.plugins.remove_plugins(instance_id="direct")
+        config.format("no templates", "label")
+        with self.assertRaises(RuntimeError):
+            formatter.format_plugin("direct")
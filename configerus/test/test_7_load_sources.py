@@ -0,0 +1,513 @@
+"""
+
+Test source loading strategies
+
+Here we test the different ways that Config can ask its sources for data, and
+that they all produce the same merged results as a plain serial load.
+
+"""
+import asyncio
+import logging
+import unittest
+import os.path
+import threading
+import time
+from tempfile import mkdtemp
+from shutil import rmtree
+from typing import Any, Dict
+from unittest import mock
+
+import configerus
+from configerus.config import Config
+from configerus.plugin import SourceFactory
+from configerus.contrib.dict import PLUGIN_ID_SOURCE_DICT
+from configerus.contrib.files import PLUGIN_ID_SOURCE_PATH
+
+from configerus.test import make_test_config, test_config_cleanup
+
+logger = logging.getLogger("test_load_sources")
+
+config_sources = [
+    {
+        "name": "low",
+        "priority": 20,
+        "type": PLUGIN_ID_SOURCE_DICT,
+        "data": {
+            "config": {"1": "low 1", "2": {"1": "low 2.1", "2": "low 2.2"}},
+            "variables": {"one": "low one"},
+        },
+    },
+    {
+        "name": "middle",
+        "priority": 50,
+        "type": PLUGIN_ID_SOURCE_PATH,
+        "data": {
+            "config.json": {"2": {"1": "middle 2.1"}, "3": "middle 3"},
+            "variables.yml": {"two": "middle two"},
+        },
+    },
+    {
+        "name": "high",
+        "priority": 80,
+        "type": PLUGIN_ID_SOURCE_DICT,
+        "data": {
+            "config": {"3": "high 3", "4": ["high 4.0", "high 4.1"]},
+        },
+    },
+]
+""" Contents of test config sources """
+
+PLUGIN_ID_SOURCE_ASYNC = "test_async"
+""" source plugin id for the test async source plugin """
+
+
+@SourceFactory(plugin_id=PLUGIN_ID_SOURCE_ASYNC)
+def plugin_factory_source_async(config: Config, instance_id: str = ""):
+    """create an async test source plugin"""
+    return AsyncSourcePlugin(config, instance_id)
+
+
+class AsyncSourcePlugin:
+    """Source plugin which only offers async loading"""
+
+    def __init__(self, config: Config, instance_id: str):
+        self.config = config
+        self.instance_id = instance_id
+        self.data: Dict[str, Any] = {}
+
+    def set_data(self, data: Dict[str, Any]):
+        self.data = data
+
+    def load(self, label: str):
+        raise RuntimeError("sync load() used for an async source")
+
+    async def aload(self, label: str):
+        return self.data[label] if label in self.data else {}
+
+
+class CountingSource:
+    """Wrap a source plugin so that we can count load() calls"""
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self.loads = 0
+        self.load_manys = 0
+        if hasattr(plugin, "load_many"):
+            self.load_many = self._load_many
+
+    def __getattr__(self, name):
+        return getattr(self.plugin, name)
+
+    def load(self, label: str):
+        self.loads += 1
+        return self.plugin.load(label)
+
+    def _load_many(self, labels):
+        self.load_manys += 1
+        return self.plugin.load_many(labels)
+
+
+class SlowSource:
+    """Wrap a source plugin so that loading one label takes a while"""
+
+    def __init__(self, plugin, label: str, seconds: float):
+        self.plugin = plugin
+        self.label = label
+        self.seconds = seconds
+        self.loads = 0
+        self.started = threading.Event()
+        self.finish = threading.Event()
+
+    def __getattr__(self, name):
+        return getattr(self.plugin, name)
+
+    def load(self, label: str):
+        if label == self.label:
+            self.loads += 1
+            self.started.set()
+            self.finish.wait(self.seconds)
+        return self.plugin.load(label)
+
+
+class LoadSources(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """make a Config object which uses a mix of source types"""
+        config = configerus.new_config()
+        make_test_config(config, config_sources)
+        cls.config = config
+
+    @classmethod
+    def tearDownClass(cls):
+        test_config_cleanup(cls.config)
+
+    def _check_merged(self, loaded):
+        """Check that loaded 'config' data has the expected merge results"""
+        self.assertEqual(loaded.get("1"), "low 1")
+        self.assertEqual(loaded.get("2.1"), "middle 2.1")
+        self.assertEqual(loaded.get("2.2"), "low 2.2")
+        self.assertEqual(loaded.get("3"), "high 3")
+        self.assertEqual(loaded.get("4.1"), "high 4.1")
+
+    def test_load_serial(self):
+        """plain serial load merges in priority order"""
+        config = self.config.copy()
+        self._check_merged(config.load("config"))
+
+    def test_load_parallel(self):
+        """parallel source loading merges the same as serial"""
+        config = self.config.copy()
+        config.load_workers = 4
+
+        self._check_merged(config.load("config"))
+        self.assertEqual(
+            config.load("variables").get(),
+            self.config.copy().load("variables").get(),
+        )
+
+    def test_load_many(self):
+        """batch loading matches individual loads"""
+        config = self.config.copy()
+        middle = config.plugins.get_instance(instance_id="middle")
+        middle.plugin = CountingSource(middle.plugin)
+
+        loaded = config.load_many(["config", "variables", "paths"])
+
+        self.assertEqual(set(loaded.keys()), {"config", "variables", "paths"})
+        self._check_merged(loaded["config"])
+        self.assertEqual(loaded["variables"].get("one"), "low one")
+        self.assertEqual(loaded["variables"].get("two"), "middle two")
+        self.assertIn("middle", loaded["paths"].get())
+        # the path source was scanned once for all of the labels
+        self.assertEqual(middle.plugin.load_manys, 1)
+        self.assertEqual(middle.plugin.loads, 0)
+        # load_many shares the load() cache
+        self.assertIs(config.load("config"), loaded["config"])
+
+    def test_source_labels(self):
+        """sources can list their labels"""
+        self.assertEqual(
+            set(self.config.source_labels()), {"config", "variables"}
+        )
+
+    def test_preload(self):
+        """preload loads and times all listed labels"""
+        config = self.config.copy()
+        middle = config.plugins.get_instance(instance_id="middle")
+        middle.plugin = CountingSource(middle.plugin)
+        timings = config.preload()
+
+        self.assertEqual(set(timings.keys()), {"config", "variables"})
+        self.assertEqual(set(config.loaded.keys()), {"config", "variables"})
+        self._check_merged(config.load("config"))
+        # all of the labels were loaded in one batch
+        self.assertEqual(middle.plugin.load_manys, 1)
+
+    def test_preload_background(self):
+        """preload can run on a background thread"""
+        config = self.config.copy()
+        timings = config.preload(labels=["config"], background=True)
+        config.preload_thread.join()
+
+        self.assertEqual(list(timings.keys()), ["config"])
+        self._check_merged(config.load("config"))
+
+    def test_preload_background_with_loads(self):
+        """foreground loads can run while a background preload does"""
+        config = self.config.copy()
+        config.preload(background=True)
+        for _ in range(20):
+            config.add_source(PLUGIN_ID_SOURCE_DICT, "extra", 10)
+            self._check_merged(config.load("config"))
+        config.preload_thread.join()
+        self._check_merged(config.load("config"))
+
+    def _slow_config(self, label: str, seconds: float):
+        """copy the config, with the low source slow to load a label"""
+        config = self.config.copy()
+        low = config.plugins.get_instance(instance_id="low")
+        low.plugin = SlowSource(low.plugin, label, seconds)
+        config.reload_source("low")
+        return config, low.plugin
+
+    def test_preload_timings(self):
+        """preload times each label, and loaded labels cost nothing"""
+        config, slow = self._slow_config("variables", 0.1)
+        config.load("config")
+        timings = config.preload()
+
+        self.assertGreaterEqual(timings["variables"], 0.1)
+        self.assertLess(timings["config"], 0.1)
+
+    def test_preload_background_slow(self):
+        """a slow background preload only holds up loads of its labels"""
+        config, slow = self._slow_config("variables", 10)
+        config.load("config")
+        config.preload(labels=["variables"], background=True)
+        self.assertTrue(slow.started.wait(10))
+
+        start = time.perf_counter()
+        self._check_merged(config.load("config"))
+        self.assertLess(time.perf_counter() - start, 1)
+
+        # the preload started before the source was added, so it doesn't
+        # keep what it loaded
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "extra", 90).set_data(
+            {"variables": {"one": "extra one"}}
+        )
+        slow.finish.set()
+        config.preload_thread.join()
+        self.assertEqual(config.load("variables").get("one"), "extra one")
+
+    def test_concurrent_loads(self):
+        """threads which load the same label share one load"""
+        config, slow = self._slow_config("config", 0.2)
+        threads = [
+            threading.Thread(target=config.load, args=["config"])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(slow.loads, 1)
+        self._check_merged(config.load("config"))
+
+    def test_path_labels(self):
+        """path sources list and load the same files"""
+        path = mkdtemp()
+        try:
+            with open(os.path.join(path, "Upper.YAML"), "w") as file:
+                file.write("one: upper 1")
+            with open(os.path.join(path, "notes.txt"), "w") as file:
+                file.write("not config")
+            config = configerus.new_config()
+            config.add_source(PLUGIN_ID_SOURCE_PATH, "path").set_path(path)
+
+            self.assertEqual(config.source_labels(), ["Upper"])
+            self.assertEqual(config.load("Upper").get("one"), "upper 1")
+        finally:
+            rmtree(path)
+
+
+class AsyncLoadSources(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        """make a Config object which mixes sync and async sources"""
+        config = configerus.new_config()
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "sync", 40).set_data(
+            {"config": {"1": "sync 1", "2": "sync 2", "3": "{{2}}"}}
+        )
+        config.add_source(PLUGIN_ID_SOURCE_ASYNC, "async", 60).set_data(
+            {"config": {"2": "async 2"}}
+        )
+        self.config = config
+
+    async def test_aload(self):
+        """aload awaits async sources and runs sync ones in an executor"""
+        loaded = await self.config.aload("config")
+
+        self.assertEqual(loaded.get("1"), "sync 1")
+        self.assertEqual(loaded.get("2"), "async 2")
+        # aload shares the load() cache
+        self.assertIs(self.config.load("config"), loaded)
+
+    async def test_aload_lock_held(self):
+        """aload doesn't block the event loop while the load lock is held"""
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            with self.config.load_lock:
+                held.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait(5)
+
+        load = asyncio.ensure_future(self.config.aload("config"))
+        start = time.perf_counter()
+        await asyncio.sleep(0.05)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertFalse(load.done())
+
+        release.set()
+        loaded = await load
+        holder.join()
+        self.assertEqual(loaded.get("2"), "async 2")
+
+    async def test_aget(self):
+        """aget matches get"""
+        loaded = await self.config.aload("config")
+
+        self.assertEqual(await loaded.aget("3"), "async 2")
+        self.assertEqual(await loaded.aget("4", default="default"), "default")
+        with self.assertRaises(KeyError):
+            await loaded.aget("4")
+
+
+class SourceLayers(unittest.TestCase):
+    def _counted_config(self):
+        """make a config with two counted dict sources"""
+        config = configerus.new_config()
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "low", 40).set_data(
+            {"config": {"1": "low 1", "2": "low 2"}}
+        )
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "high", 60).set_data(
+            {"config": {"2": "high 2"}}
+        )
+        counters = {}
+        for instance in config.plugins.get_instances():
+            counters[instance.instance_id] = CountingSource(
+                instance.plugin
+            )
+            instance.plugin = counters[instance.instance_id]
+        return config, counters
+
+    def test_add_source_keeps_layers(self):
+        """adding a source only loads the new source"""
+        config, counters = self._counted_config()
+        self.assertEqual(config.load("config").get("2"), "high 2")
+
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "overlay", 90).set_data(
+            {"config": {"1": "overlay 1"}}
+        )
+        loaded = config.load("config")
+        self.assertEqual(loaded.get("1"), "overlay 1")
+        self.assertEqual(loaded.get("2"), "high 2")
+        self.assertEqual(counters["low"].loads, 1)
+        self.assertEqual(counters["high"].loads, 1)
+
+    def test_missing_label_layer(self):
+        """labels that a source leaves out of load_many are not asked again"""
+        config, counters = self._counted_config()
+        low = counters["low"]
+
+        def sparse_load_many(labels):
+            low.load_manys += 1
+            return {
+                label: low.plugin.data[label]
+                for label in labels
+                if label in low.plugin.data
+            }
+
+        low.load_many = sparse_load_many
+
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "other", 50).set_data(
+            {"other": {"1": "other 1"}}
+        )
+        config.load_many(["config", "other"])
+        self.assertEqual(low.load_manys, 1)
+
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "overlay", 90).set_data(
+            {"other": {"1": "overlay 1"}}
+        )
+        self.assertEqual(config.load("other").get("1"), "overlay 1")
+        self.assertEqual(low.load_manys, 1)
+
+    def test_remove_source(self):
+        """removing a source re-merges without loading the others"""
+        config, counters = self._counted_config()
+        self.assertEqual(config.load("config").get("2"), "high 2")
+
+        config.remove_source("high")
+        self.assertEqual(config.load("config").get("2"), "low 2")
+        self.assertEqual(counters["low"].loads, 1)
+
+        with self.assertRaises(KeyError):
+            config.remove_source("high")
+
+    def test_reload_source(self):
+        """reloading a source only loads that source again"""
+        config, counters = self._counted_config()
+        self.assertEqual(config.load("config").get("2"), "high 2")
+
+        config.plugins.get_plugin(instance_id="high").set_data(
+            {"config": {"2": "new high 2"}}
+        )
+        config.reload_source("high")
+        self.assertEqual(config.load("config").get("2"), "new high 2")
+        self.assertEqual(counters["low"].loads, 1)
+        self.assertEqual(counters["high"].loads, 2)
+
+        config.load("config", force_reload=True)
+        self.assertEqual(counters["low"].loads, 2)
+        self.assertEqual(counters["high"].loads, 3)
+
+
+class DiskCache(unittest.TestCase):
+    def setUp(self):
+        """make a path source config with a disk cache"""
+        self.cache_path = mkdtemp()
+        self.source_path = mkdtemp()
+        with open(os.path.join(self.source_path, "config.json"), "w") as file:
+            file.write('{"1": "file 1"}')
+
+    def tearDown(self):
+        rmtree(self.cache_path)
+        rmtree(self.source_path)
+
+    def _cached_config(self):
+        """make a new config object that uses the disk cache"""
+        config = configerus.new_config()
+        config.cache_path = self.cache_path
+        config.add_source(PLUGIN_ID_SOURCE_PATH, "path").set_path(
+            self.source_path
+        )
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "dict", 80).set_data(
+            {"config": {"2": "dict 2"}}
+        )
+        instance = config.plugins.get_instance(instance_id="path")
+        instance.plugin = CountingSource(instance.plugin)
+        return config, instance.plugin
+
+    def test_disk_cache(self):
+        """merged config is cached on disk until a source changes"""
+        config, counter = self._cached_config()
+        self.assertEqual(config.load("config").get("1"), "file 1")
+        self.assertEqual(counter.load_manys, 1)
+
+        config, counter = self._cached_config()
+        loaded = config.load("config")
+        self.assertEqual(loaded.get("1"), "file 1")
+        self.assertEqual(loaded.get("2"), "dict 2")
+        self.assertEqual(counter.load_manys, 0)
+
+        with open(os.path.join(self.source_path, "config.json"), "w") as file:
+            file.write('{"1": "changed file 1"}')
+
+        config, counter = self._cached_config()
+        self.assertEqual(config.load("config").get("1"), "changed file 1")
+        self.assertEqual(counter.load_manys, 1)
+
+    def test_disk_cache_force_reload(self):
+        """force_reload skips the disk cache"""
+        config, counter = self._cached_config()
+        config.load("config")
+        config.load("config", force_reload=True)
+        self.assertEqual(counter.load_manys, 2)
+
+    def test_disk_cache_one_scan(self):
+        """fingerprinting many labels scans the source path once"""
+        with open(os.path.join(self.source_path, "other.json"), "w") as file:
+            file.write('{"1": "other 1"}')
+        config, _ = self._cached_config()
+        with mock.patch("os.listdir", wraps=os.listdir) as listdir:
+            config.load_many(["config", "other"])
+        # one scan to fingerprint, one to load
+        self.assertEqual(listdir.call_count, 2)
+
+    def test_disk_cache_file_names(self):
+        """labels can't name cache files outside of the cache path"""
+        config, _ = self._cached_config()
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "odd", 90).set_data(
+            {"../escape": {"1": "odd 1"}}
+        )
+        self.assertEqual(config.load("../escape").get("1"), "odd 1")
+        self.assertEqual(len(os.listdir(self.cache_path)), 1)
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(self.cache_path, "..", "escape.pickle")
+            )
+        )
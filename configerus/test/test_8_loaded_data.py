@@ -0,0 +1,482 @@
+"""
+
+Test Loaded data handling
+
+Here we test the different ways that a Loaded object can keep and hand out its
+data, and that they all give the same results as the defaults.
+
+"""
+import logging
+import os.path
+import tempfile
+import unittest
+from unittest import mock
+
+import configerus
+from configerus.config import DEPENDENCY_FILE, DEPENDENCY_LABEL
+from configerus.contrib.dict import PLUGIN_ID_SOURCE_DICT
+from configerus.loaded import LOADED_RESOLVE_EAGER
+from configerus.shared import FrozenDict, FrozenList, MISSING
+
+logger = logging.getLogger("test_loaded_data")
+
+config_data = {
+    "config": {
+        "1": "first 1",
+        "2": {"1": "{{1}}", "2": ["{{1}}", "plain"]},
+        "3": {"1": "plain 3.1", "2": ["plain 3.2.0"]},
+        "4": "{{variables:one}}",
+    },
+    "variables": {"one": "variables one", "two": "{{config:1}}"},
+}
+""" Contents of the test dict source """
+
+
+def make_config():
+    """Make a config object from the test data"""
+    config = configerus.new_config()
+    config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(config_data)
+    return config
+
+
+class LoadedData(unittest.TestCase):
+    def test_format_does_not_change_data(self):
+        """formatting builds new data and leaves the loaded data alone"""
+        loaded = make_config().load("config")
+
+        self.assertEqual(
+            loaded.get("2"), {"1": "first 1", "2": ["first 1", "plain"]}
+        )
+        self.assertEqual(loaded.get("2.1", format=False), "{{1}}")
+        self.assertEqual(loaded.get("2.2.0", format=False), "{{1}}")
+        # untemplated subtrees are handed back as they are
+        self.assertIs(loaded.get("3"), loaded.data["3"])
+
+    def test_readonly(self):
+        """read-only config is frozen and formatting keeps it frozen"""
+        config = make_config()
+        config.readonly = True
+        loaded = config.load("config")
+
+        self.assertIsInstance(loaded.data, FrozenDict)
+        self.assertIsInstance(loaded.data["3"]["2"], FrozenList)
+        with self.assertRaises(TypeError):
+            loaded.data["1"] = "changed"
+        with self.assertRaises(TypeError):
+            loaded.get("3.2").append("changed")
+
+        formatted = loaded.get("2")
+        self.assertIsInstance(formatted, FrozenDict)
+        self.assertIsInstance(formatted["2"], FrozenList)
+        self.assertEqual(
+            formatted, {"1": "first 1", "2": ["first 1", "plain"]}
+        )
+        self.assertEqual(loaded.get("2.1", format=False), "{{1}}")
+
+        self.assertIs(loaded.get("3"), loaded.data["3"])
+        self.assertEqual(loaded.get("4"), "variables one")
+
+    def test_readonly_deep(self):
+        """data deeper than the recursion limit can be loaded read-only"""
+        data = leaf = {}
+        for _ in range(5000):
+            leaf["n"] = [{}]
+            leaf = leaf["n"][0]
+        leaf["value"] = "deep"
+
+        config = configerus.new_config()
+        config.readonly = True
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(
+            {"config": data}
+        )
+        node = config.load("config").data
+        for _ in range(5000):
+            self.assertIsInstance(node, FrozenDict)
+            self.assertIsInstance(node["n"], FrozenList)
+            node = node["n"][0]
+        self.assertEqual(node, {"value": "deep"})
+        self.assertNotIsInstance(leaf, FrozenDict)
+
+    def test_resolve_eager(self):
+        """eager resolving formats everything once when loading"""
+        config = make_config()
+        loaded = config.load("config", resolve=LOADED_RESOLVE_EAGER)
+
+        self.assertTrue(loaded.resolved)
+        self.assertEqual(loaded.get("2.1", format=False), "first 1")
+        self.assertEqual(loaded.data["4"], "variables one")
+        self.assertEqual(
+            loaded.get("2"), {"1": "first 1", "2": ["first 1", "plain"]}
+        )
+        # defaults are still formatted
+        self.assertEqual(loaded.get("5", default="{{1}}"), "first 1")
+        # a lazy load of an eager label keeps the resolved data
+        self.assertIs(config.load("config"), loaded)
+        self.assertFalse(config.load("config", force_reload=True).resolved)
+
+        with self.assertRaises(ValueError):
+            config.load("config", resolve="sometimes")
+
+    def test_format_memo(self):
+        """formatted values are kept until something that they read changes"""
+        config = make_config()
+        self.assertFalse(config.format_memo)
+        config.format_memo = True
+        loaded = config.load("config")
+
+        self.assertEqual(loaded.get("4"), "variables one")
+        self.assertEqual(loaded.get("2.1"), "first 1")
+        self.assertIs(loaded.get("2"), loaded.get(["2"]))
+        self.assertIn(("4",), loaded.formatted)
+        self.assertEqual(
+            loaded.formatted[("4",)][1],
+            {(DEPENDENCY_LABEL, "variables")},
+        )
+
+        config.load("variables", force_reload=True)
+        # only the value which read the reloaded label is forgotten
+        self.assertNotIn(("4",), loaded.formatted)
+        self.assertIn(("2", "1"), loaded.formatted)
+
+        # values which read their own label through templates
+        config.invalidate(DEPENDENCY_LABEL, "config")
+        self.assertNotIn(("2", "1"), loaded.formatted)
+        self.assertIn(("1",), loaded.formatted)
+
+    def test_format_memo_file(self):
+        """values which embed files are forgotten when the file is"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file = os.path.join(tmp_dir, "embed.txt")
+            with open(file, "w") as file_handle:
+                file_handle.write("first")
+
+            config = configerus.new_config()
+            config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(
+                {"files": {"embed": "{{file::" + file + "}}"}}
+            )
+            loaded = config.load("files")
+            self.assertEqual(loaded.get("embed"), "first")
+
+            # without the memo, files are read every time
+            with open(file, "w") as file_handle:
+                file_handle.write("second")
+            self.assertEqual(loaded.get("embed"), "second")
+
+            config.format_memo = True
+            self.assertEqual(loaded.get("embed"), "second")
+            with open(file, "w") as file_handle:
+                file_handle.write("third")
+            self.assertEqual(loaded.get("embed"), "second")
+
+            config.invalidate(DEPENDENCY_FILE, file)
+            self.assertEqual(loaded.get("embed"), "third")
+
+            # a new formatter forgets everything
+            loaded.get("embed")
+            config.add_formatter("get", "extra_get")
+            self.assertEqual(loaded.formatted, {})
+
+    def test_index(self):
+        """an indexed label gives the same results as walking the tree"""
+        config = make_config()
+        config.index_loaded = True
+        loaded = config.load("config")
+        self.assertIsNone(loaded.index)
+
+        self.assertEqual(loaded.get("3.2.0"), "plain 3.2.0")
+        self.assertIsNotNone(loaded.index)
+        self.assertIs(loaded.index[("3", "1")], loaded.data["3"]["1"])
+        self.assertEqual(loaded.get(["2", "2.00"]), "first 1")
+        self.assertEqual(loaded.get("", format=False), loaded.data)
+        self.assertTrue(loaded.has("2.2"))
+        self.assertFalse(loaded.has("2.3"))
+        with self.assertRaises(KeyError):
+            loaded.get("5")
+
+        # misses are answered by the index alone, unless it can't answer
+        with mock.patch("configerus.loaded.tree_find") as tree_find:
+            self.assertFalse(loaded.has("2.3"))
+            self.assertIs(loaded.find("3.9.1"), MISSING)
+            tree_find.assert_not_called()
+        self.assertEqual(loaded.get("3.2.00"), "plain 3.2.0")
+
+        loaded._reload({"1": "reloaded"})
+        self.assertIsNone(loaded.index)
+        self.assertEqual(loaded.get("1"), "reloaded")
+
+    def test_get_many(self):
+        """getting many keys at once matches getting them one at a time"""
+        loaded = make_config().load("config")
+        keys = ["1", "2.1", "2.2.0", ["3", "2"], "4", "5"]
+
+        values = loaded.get_many(keys, defaults={"5": "{{1}}"})
+        self.assertEqual(
+            values,
+            {
+                "1": "first 1",
+                "2.1": "first 1",
+                "2.2.0": "first 1",
+                "3.2": ["plain 3.2.0"],
+                "4": "variables one",
+                "5": "first 1",
+            },
+        )
+        self.assertEqual(
+            loaded.get_many(
+                keys, defaults=[None] * 5 + ["five"], as_tuple=True
+            ),
+            tuple(loaded.get(key, default="five") for key in keys),
+        )
+        self.assertEqual(
+            loaded.get_many(["2.1", "4"], format=False, as_tuple=True),
+            ("{{1}}", "{{variables:one}}"),
+        )
+
+        with self.assertRaises(KeyError):
+            loaded.get_many(["1", "2.5"])
+        with self.assertRaises(KeyError):
+            loaded.get_many(["6.1"])
+        with self.assertRaises(ValueError):
+            loaded.get_many(["1", "2"], defaults=["one"])
+
+    def test_keys(self):
+        """keys under a prefix can be listed without formatting"""
+        loaded = make_config().load("config")
+
+        self.assertEqual(
+            loaded.keys(), ["1", "2.1", "2.2.0", "2.2.1", "3.1", "3.2.0", "4"]
+        )
+        self.assertEqual(loaded.keys("3"), ["3.1", "3.2.0"])
+        self.assertEqual(loaded.keys(["2", "1"]), ["2.1"])
+        self.assertEqual(loaded.keys("5"), [])
+
+        self.assertEqual(
+            loaded.items("2"),
+            [("2.1", "{{1}}"), ("2.2.0", "{{1}}"), ("2.2.1", "plain")],
+        )
+        self.assertEqual(
+            loaded.items("2.2", format=True),
+            [("2.2.0", "first 1"), ("2.2.1", "plain")],
+        )
+
+        self.assertTrue(loaded.has_prefix("2.2"))
+        self.assertTrue(loaded.has_prefix("2.2.1"))
+        self.assertFalse(loaded.has_prefix("2.3"))
+        self.assertFalse(loaded.has_prefix("1.1"))
+
+    def test_format_deep(self):
+        """data deeper than the recursion limit can be formatted"""
+        data = leaf = {}
+        for _ in range(5000):
+            leaf["n"] = [{}]
+            leaf = leaf["n"][0]
+        leaf["value"] = "{{config:1}}"
+
+        config = make_config()
+        formatted = config.format(data, "config")
+        for _ in range(5000):
+            formatted = formatted["n"][0]
+        self.assertEqual(formatted, {"value": "first 1"})
+        self.assertEqual(leaf["value"], "{{config:1}}")
+
+    def test_find(self):
+        """misses can be found without exceptions"""
+        config = make_config()
+        loaded = config.load("config")
+
+        self.assertEqual(loaded.find("2.1"), "first 1")
+        self.assertEqual(loaded.find("2.1", format=False), "{{1}}")
+        self.assertIs(loaded.find("2.5"), MISSING)
+        self.assertFalse(loaded.has("2.5"))
+
+        self.assertEqual(
+            config.format("{{variables:nope?fallback}}", "config"), "fallback"
+        )
+        self.assertEqual(
+            config.format("{{nolabel:nope?fallback}}", "config"), "fallback"
+        )
+
+    def test_template_free(self):
+        """frozen subtrees without templates are flagged, and skipped"""
+        config = make_config()
+        config.readonly = True
+        loaded = config.load("config")
+
+        self.assertIn(id(loaded.data["3"]), loaded.template_free)
+        self.assertIn(id(loaded.data["3"]["2"]), loaded.template_free)
+        self.assertNotIn(id(loaded.data["2"]), loaded.template_free)
+        self.assertNotIn(id(loaded.data["2"]["2"]), loaded.template_free)
+        self.assertNotIn(id(loaded.data), loaded.template_free)
+
+        # flagged nodes are not walked at all, even if they have templates
+        templated = loaded.data["2"]
+        self.assertIs(
+            loaded.parent.format(
+                {"templated": templated},
+                "config",
+                template_free={id(templated): templated},
+            )["templated"],
+            templated,
+        )
+
+        # copies share the frozen data, so they reuse the flags
+        with mock.patch(
+            "configerus.loaded.template_free_nodes"
+        ) as template_free_nodes:
+            copy = loaded.parent.copy()
+            copied = copy.load("config")
+        template_free_nodes.assert_not_called()
+        self.assertIs(copied.template_free, loaded.template_free)
+        self.assertEqual(copied.get("3.2"), loaded.get("3.2"))
+
+        # data which can be changed in place is never flagged
+        config = configerus.new_config()
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(
+            {"config": {"1": "one", "sub": {"a": "plain"}}}
+        )
+        loaded = config.load("config")
+        self.assertEqual(loaded.template_free, {})
+        sub = loaded.get("sub")
+        sub["b"] = "{{1}}"
+        self.assertEqual(loaded.get("sub"), {"a": "plain", "b": "one"})
+
+        # lazily merged data is flagged once it is merged
+        config = make_config()
+        config.readonly = True
+        config.lazy_merge = True
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "other").set_data(
+            {"config": {"5": "five"}}
+        )
+        lazy = config.load("config")
+        self.assertEqual(lazy.template_free, {})
+        self.assertIn(id(lazy.data["3"]), lazy.template_free)
+
+    def test_format_many(self):
+        """template targets in a subtree are resolved in batches"""
+        config = make_config()
+        config.format("", "config")
+        plugin = config.formatter.format_plugin("get")
+        batches = []
+        format_many = plugin.format_many
+
+        def spy(keys, default_label):
+            batches.append(list(keys))
+            return format_many(keys, default_label)
+
+        plugin.format_many = spy
+
+        data = {
+            "a": "{{variables:one}}",
+            "b": ["{{1}}", "x {{3.1}} {{variables:one}}"],
+            "c": "{{variables:nope?fallback {{2.1}}}}",
+        }
+        self.assertEqual(
+            config.format(data, "config"),
+            {
+                "a": "variables one",
+                "b": ["first 1", "x plain 3.1 variables one"],
+                "c": "fallback first 1",
+            },
+        )
+        # tag defaults are not batched, nested ones are resolved on their own
+        self.assertEqual(
+            batches[0], ["variables:one", "1", "3.1", "variables:nope"]
+        )
+
+        with self.assertRaises(KeyError):
+            config.format(["{{1}}", "{{variables:nope}}"], "config")
+
+    def test_format_pass_memo(self):
+        """each template target is resolved once per format pass"""
+        config = configerus.new_config()
+        config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(
+            {
+                "config": {"a": "{{variables:one}}", "b": "{{variables:one}}"},
+                "variables": {"one": "one"},
+            }
+        )
+        config.format_memo = True
+        config.format("", "config")
+        # leave batching out of it
+        config.formatter.batch_plugins = set()
+        plugin = config.formatter.format_plugin("get")
+        calls = []
+        plugin_format = plugin.format
+
+        def spy(key, default_label):
+            calls.append(key)
+            return plugin_format(key, default_label)
+
+        plugin.format = spy
+
+        self.assertEqual(
+            config.format(["{{a}}", "{{b}}", "{{a}}"], "config"),
+            ["one", "one", "one"],
+        )
+        # nested passes for a and b share the memo
+        self.assertEqual(calls, ["a", "variables:one", "b"])
+        # values which used the memo still depend on what it read
+        loaded = config.load("config")
+        self.assertIn(
+            (DEPENDENCY_LABEL, "variables"), loaded.formatted[("b",)][1]
+        )
+
+        # the next pass starts again
+        config.format("{{a}}", "config")
+        self.assertEqual(calls[3:], ["a"])
+
+    def test_lazy_merge(self):
+        """lazily merged layers give the same results as merging them all"""
+        layers = [
+            {"merge": {"1": "high 1", "3": {"1": "high 3.1"}}, "5": "high"},
+            {"merge": "middle, ignored", "5": {"1": "middle 5.1"}},
+            {"merge": {"2": "low 2", "3": {"2": "low 3.2"}}, "4": ["low"]},
+        ]
+
+        def make_layered_config(lazy_merge: bool, readonly: bool = False):
+            config = configerus.new_config()
+            config.lazy_merge = lazy_merge
+            config.readonly = readonly
+            for priority, layer in enumerate(reversed(layers)):
+                config.add_source(
+                    PLUGIN_ID_SOURCE_DICT, f"layer{priority}", priority
+                ).set_data({"config": layer})
+            return config
+
+        lazy = make_layered_config(True).load("config")
+        merged = make_layered_config(False).load("config")
+
+        self.assertEqual(lazy.get("merge.3.1"), "high 3.1")
+        self.assertEqual(lazy.get("4.0"), "low")
+        # only what was read has been merged
+        self.assertIsNotNone(lazy.layered)
+        self.assertEqual(set(lazy.layered.children), {"merge", "4"})
+        self.assertNotIn("1", lazy.layered.children["merge"].children)
+        # top level keys are read from the layers without merging them all
+        self.assertEqual(
+            lazy.get_many(["5", "merge.2"], format=False),
+            {"5": "high", "merge.2": "low 2"},
+        )
+        self.assertIsNone(lazy.layered.materialized)
+        # the root key is the merged root, default or not
+        root = make_layered_config(True).load("config")
+        self.assertEqual(
+            root.get_many(["", "5"], format=False),
+            {"": merged.data, "5": "high"},
+        )
+        root = make_layered_config(True).load("config")
+        self.assertEqual(
+            root.get_many([""], defaults=["default"], format=False),
+            {"": merged.data},
+        )
+
+        for key in ["merge", "merge.3", "5", "4", "merge.1", "5.1"]:
+            self.assertEqual(
+                lazy.find(key, format=False), merged.find(key, format=False)
+            )
+        self.assertEqual(lazy.data, merged.data)
+        self.assertEqual(list(lazy.data["merge"]), list(merged.data["merge"]))
+
+        frozen = make_layered_config(True, readonly=True).load("config")
+        self.assertIsInstance(frozen.get("merge.3"), FrozenDict)
+        self.assertIsInstance(frozen.get("4"), FrozenList)
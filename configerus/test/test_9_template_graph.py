@@ -0,0 +1,100 @@
+"""
+
+Test static template analysis
+
+Here we scan config for template references without formatting it, and check
+that cycles are found and that labels are ordered by their references.
+
+"""
+import logging
+import unittest
+
+import configerus
+from configerus.contrib.dict import PLUGIN_ID_SOURCE_DICT
+from configerus.graph import template_targets
+from configerus.loaded import LOADED_RESOLVE_EAGER
+
+logger = logging.getLogger("test_template_graph")
+
+
+def make_config(data):
+    """Make a config object with a single dict source"""
+    config = configerus.new_config()
+    config.add_source(PLUGIN_ID_SOURCE_DICT, "data").set_data(data)
+    return config
+
+
+class TemplateGraph(unittest.TestCase):
+    def test_template_targets(self):
+        """template targets are found without formatting"""
+        self.assertEqual(template_targets("plain"), [])
+        # defaults are only formatted on a miss, so they aren't targets
+        self.assertEqual(
+            template_targets("{{one}} and {{file::a/b.json?{{two}}}}"),
+            [(None, "one"), ("file", "a/b.json")],
+        )
+        # a built target can't be known, but its inner tags can
+        self.assertEqual(
+            template_targets("{{ {{variables:which}} }}"),
+            [(None, "variables:which"), (None, None)],
+        )
+
+    def test_label_order(self):
+        """labels come after the labels that they refer to"""
+        config = make_config(
+            {
+                "app": {"name": "{{names:app}}", "url": "{{urls:app}}"},
+                "urls": {"app": "http://{{names:app}}"},
+                "names": {"app": "app"},
+            }
+        )
+        graph = config.template_graph(["app"])
+
+        self.assertEqual(graph.label_order(), ["names", "urls", "app"])
+        self.assertEqual(graph.cycles(), [])
+        self.assertEqual(graph.missing, set())
+
+        timings = config.preload(["app"], resolve=LOADED_RESOLVE_EAGER)
+        self.assertEqual(set(timings), {"app", "urls", "names"})
+        self.assertTrue(config.loaded["urls"].resolved)
+        self.assertEqual(config.loaded["app"].data["url"], "http://app")
+
+    def test_cycles(self):
+        """templates which refer back to themselves are reported"""
+        config = make_config(
+            {
+                "one": {"a": "{{two:a}}", "b": "b", "c": "{{c}}"},
+                "two": {"a": {"nested": "{{one:a}}"}, "b": "{{one:b}}"},
+            }
+        )
+        graph = config.template_graph(["one"])
+
+        self.assertEqual(
+            graph.cycles(),
+            [[("one", "a"), ("two", "a.nested")], [("one", "c")]],
+        )
+        # labels which refer to each other are fine without key cycles
+        self.assertEqual(graph.label_order(), ["one", "two"])
+
+        with self.assertRaises(ValueError):
+            config.preload(["one"])
+
+    def test_default_cycles(self):
+        """tag defaults which refer back are not cycles"""
+        config = make_config(
+            {"one": {"a": "{{one:b?{{one:a}}}}", "b": "b", "c": "{{c?x}}"}}
+        )
+        graph = config.template_graph(["one"])
+
+        self.assertEqual(graph.cycles(), [[("one", "c")]])
+        config = make_config({"one": {"a": "{{one:b?{{one:a}}}}", "b": "b"}})
+        self.assertEqual(config.preload(["one"]).keys(), {"one"})
+        self.assertEqual(config.load("one").get("a"), "b")
+
+    def test_missing_labels(self):
+        """labels which templates refer to but no source has are reported"""
+        config = make_config({"one": {"a": "{{two:a?default}}"}})
+        graph = config.template_graph(["one"])
+
+        self.assertEqual(graph.missing, {"two"})
+        self.assertEqual(config.preload(["one"]).keys(), {"one"})